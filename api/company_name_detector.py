@@ -2,176 +2,135 @@
 # ===========================
 # File: api/company_name_detector.py
 # ===========================
-from flask import Blueprint, request, jsonify
-from sentence_transformers import SentenceTransformer, util
-from difflib import SequenceMatcher
-import numpy as np
-import re
+from flask import Blueprint, g, request
+from collections import OrderedDict
+import threading
+import time
+from config import Config
 from logger_config import Logger
+from utils import (
+    admission, cpu_planner, memory_monitor, model_lifecycle, parallel_prescore, payload_codec, request_trace,
+    slow_requests
+)
+from utils.compact_embeddings import CompactEmbeddings, score_drift
+from utils.lexical_scorer import LexicalPlaceholderScorer
 
 # Create blueprint
 bp = Blueprint('company_name_detector', __name__)
 logger = Logger.get_logger()
 
-# Load model once (global)
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
-# Enhanced placeholder patterns
-PLACEHOLDER_PATTERNS = [
-    "YOUR COMPANY", "YOUR BRAND", "COMPANY NAME", "INDUSTRY NAME", "SOCCER CLUB", "BRAND NAME", "SCHOOL NAME", "SALON NAME","THE CHURCH NAME","Catering Service",
-    "CHURCH NAME", "COLLEGE NAME", "ENTERPRISE NAME", "BOOK STORE", "SHOP NAME","HVAC SERVICE","CAFE NAME",
-    "STORE FOUNDATION", "ANY ASSOCIATION", "ORGANISER NAME", "FARM NAME",
-    "FOOD STALL", "PUBLICATION NAME", "WRITE COMPANY NAME", "UNIVERSITY NAME",
-    "ORGANIZATION NAME", "FIRM NAME", "AGENCY NAME", "STUDIO NAME", "CLINIC NAME",
-    "HOSPITAL NAME", "RESTAURANT NAME", "HOTEL NAME", "BANK NAME", "INSURANCE NAME","CLEANING SERVICE",
-    "COMPANY TITLE", "BRAND TITLE", "ORGANIZATION TITLE", "CLUB NAME", "YOUR CLUB NAME","CLEANING CLASSES", "CLEANING CLASS",
-    "BUSINESS NAME", "CORPORATION NAME", "ENTERPRISE TITLE", "ESTABLISHMENT NAME",
-    "INSTITUTION NAME", "VENUE NAME", "SERVICE NAME", "CENTER NAME", "GROUP NAME",
-    "ASSOCIATION NAME", "FOUNDATION NAME", "SOCIETY NAME", "UNION NAME", "LEAGUE NAME",
-    "COOPERATIVE NAME", "PARTNERSHIP NAME", "LLC NAME", "INC NAME", "CORP NAME",
-    "INSERT COMPANY NAME", "ADD COMPANY NAME", "ENTER COMPANY NAME",
-    "COMPANY NAME HERE", "YOUR BUSINESS NAME", "BUSINESS NAME HERE",
-    "ORGANIZATION NAME HERE", "BRAND NAME HERE", "NAME OF COMPANY",
-    "NAME OF ORGANIZATION", "NAME OF BUSINESS", "COMPANY/ORGANIZATION NAME"
-]
-
-# Regex patterns
-REGEX_PATTERNS = [
-    r'\[.*?(?:company|business|organization|brand|name).*?\]',
-    r'\{.*?(?:company|business|organization|brand|name).*?\}',
-    r'\(.*?(?:company|business|organization|brand|name).*?\)',
-    r'<.*?(?:company|business|organization|brand|name).*?>',
-    r'___+\s*(?:company|business|organization|brand|name).*?___+',
-    r'\.\.\.+\s*(?:company|business|organization|brand|name)',
-    r'(?:company|business|organization|brand|name)\s*\.\.\.+',
-    r'_+(?:company|business|organization|brand|name)_+',
-    r'\*+(?:company|business|organization|brand|name)\*+',
-]
+MODEL_NAME = 'all-MiniLM-L6-v2'
 
-class AdvancedPlaceholderDetector:
-    def __init__(self):
+class AdvancedPlaceholderDetector(LexicalPlaceholderScorer):
+    def __init__(self, model, embedding_dtype='float32', cache_size=0):
+        super().__init__()
         self.model = model
-        self.placeholder_patterns = PLACEHOLDER_PATTERNS
-        self.regex_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in REGEX_PATTERNS]
         
-        self.normalized_placeholders = [self.normalize_text(p) for p in self.placeholder_patterns]
-        self.placeholder_embeddings = self.model.encode(self.normalized_placeholders, convert_to_tensor=True)
-        
-        self.sentence_indicators = [
-            'the', 'a', 'an', 'this', 'that', 'these', 'those', 'our', 'their', 'his', 'her',
-            'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
-            'will', 'would', 'could', 'should', 'must', 'can', 'may', 'might',
-            'in', 'on', 'at', 'by', 'for', 'with', 'to', 'from', 'of', 'about'
-        ]
-
-    def normalize_text(self, text):
-        if not text:
-            return ""
-        normalized = re.sub(r'\s+', ' ', text.strip().lower())
-        normalized = re.sub(r'[^\w\s\[\](){}><_.*-]', '', normalized)
-        return normalized
+        # Placeholder matrix and cached text embeddings are stored pre-normalised
+        # in embedding_dtype, so similarity is a dot product on the compact form
+        self.embedding_dtype = embedding_dtype
+        self.placeholder_embeddings = CompactEmbeddings.from_float(
+            self.encode(self.normalized_placeholders), embedding_dtype
+        )
+        self.cache_size = cache_size
+        self._embedding_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
 
-    def is_standalone_text(self, text, context_texts=None):
-        normalized = self.normalize_text(text)
-        words = normalized.split()
-        
-        if len(words) > 6:
-            return False
-        
-        for word in words:
-            if word in self.sentence_indicators:
-                return False
-        
-        sentence_patterns = [
-            r'\b(?:the|a|an)\s+\w+',
-            r'\w+\s+(?:is|are|was|were|will|would)\s+',
-            r'\w+\s+(?:has|have|had)\s+',
-            r'(?:in|on|at|by|for|with|to|from)\s+\w+',
-        ]
-        
-        for pattern in sentence_patterns:
-            if re.search(pattern, normalized):
-                return False
-        
-        if text.strip().endswith(('.', '!', '?', ';')):
-            return False
-        
-        verb_patterns = [
-            r'\b(?:provide|offer|deliver|create|make|build|develop|design|sell|buy)\b',
-            r'\b(?:specializes?|focuses?|operates?|manages?|handles?)\b'
-        ]
-        
-        for pattern in verb_patterns:
-            if re.search(pattern, normalized):
-                return False
-        
-        return True
+    def encode(self, texts):
+        return self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
 
-    def exact_pattern_match(self, text):
-        normalized = self.normalize_text(text)
-        
-        for pattern in self.normalized_placeholders:
-            if normalized == pattern:
-                return True, 1.0
-        
-        for regex_pattern in self.regex_patterns:
-            if regex_pattern.search(text):
-                return True, 0.95
-        
-        return False, 0.0
-
-    def format_analysis(self, text):
-        score = 0.0
-        
-        if text.isupper():
-            score += 0.3
-        
-        if re.search(r'[\[\](){}><]', text):
-            score += 0.4
-        
-        if re.search(r'[_.]{2,}', text):
-            score += 0.3
-        
-        placeholder_words = ['company', 'business', 'organization', 'brand', 'name', 'your', 'insert', 'add', 'enter', 'classes', 'salon', 'service']
-        text_lower = text.lower()
-        for word in placeholder_words:
-            if word in text_lower:
-                score += 0.2
-                break
-        
-        return min(score, 1.0)
+    def embed(self, normalized_texts):
+        """Compact embeddings for normalised texts, served from the LRU cache where possible"""
+        rows = [None] * len(normalized_texts)
+        missing = []
+        
+        with self._cache_lock:
+            for i, text in enumerate(normalized_texts):
+                cached = self._embedding_cache.get(text)
+                if cached is not None:
+                    self._embedding_cache.move_to_end(text)
+                    rows[i] = cached
+                else:
+                    missing.append(i)
+        
+        request_trace.annotate(encoder_batch=len(missing), cache_hits=len(normalized_texts) - len(missing))
+        if missing:
+            encoded = CompactEmbeddings.from_float(
+                self.encode([normalized_texts[i] for i in missing]), self.embedding_dtype
+            )
+            with self._cache_lock:
+                for j, i in enumerate(missing):
+                    rows[i] = encoded.row(j)
+                    if self.cache_size:
+                        self._embedding_cache[normalized_texts[i]] = rows[i].copy()
+                while len(self._embedding_cache) > self.cache_size:
+                    self._embedding_cache.popitem(last=False)
+        
+        return CompactEmbeddings.stack(rows, self.embedding_dtype)
 
     def semantic_similarity(self, texts):
         normalized_texts = [self.normalize_text(t) for t in texts]
         
-        if not any(normalized_texts):
-            return [0.0] * len(texts)
+        # Text that normalises to nothing has no semantic content; only the rest are embedded
+        scores = [0.0] * len(texts)
+        present = [i for i, text in enumerate(normalized_texts) if text]
+        if not present:
+            return scores
         
-        text_embeddings = self.model.encode(normalized_texts, convert_to_tensor=True)
-        cosine_scores = util.cos_sim(text_embeddings, self.placeholder_embeddings)
-        max_scores = cosine_scores.max(dim=1).values.cpu().numpy()
+        text_embeddings = self.embed([normalized_texts[i] for i in present])
+        cosine_scores = text_embeddings.similarity(self.placeholder_embeddings)
+        max_scores = cosine_scores.max(axis=1)
         
-        return max_scores.tolist()
+        for i, score in zip(present, max_scores.tolist()):
+            scores[i] = score
+        return scores
 
-    def fuzzy_matching(self, text):
-        normalized = self.normalize_text(text)
-        
-        if not normalized:
-            return 0.0
-        
-        scores = []
-        
-        for pattern in self.normalized_placeholders:
-            scores.append(SequenceMatcher(None, normalized, pattern).ratio())
-        
-        text_words = set(normalized.split())
-        for pattern in self.normalized_placeholders:
-            pattern_words = set(pattern.split())
-            if text_words and pattern_words:
-                jaccard = len(text_words.intersection(pattern_words)) / len(text_words.union(pattern_words))
-                scores.append(jaccard)
+    def measure_embedding_drift(self, probe_texts, threshold=0.75, band=0.15,
+                                semantic_weight=0.4, fuzzy_weight=0.3, format_weight=0.3):
+        """Compare compact semantic scores against float32 on probes that score near the threshold
+
+        Probes are the standalone texts whose float32 combined score (with the
+        given weights) lies within `band` of `threshold`, since drift only
+        matters where it can flip a decision. The returned max_score_drift is
+        per unit of semantic weight: the combined score moves by at most
+        semantic_weight times it.
+        """
+        references = self.encode(self.normalized_placeholders)
+        probes = [text for text in dict.fromkeys(probe_texts) if text and self.is_standalone_text(text)]
+        probes = [text for text in probes if self.normalize_text(text)]
+        queries = self.encode([self.normalize_text(text) for text in probes])
+        
+        semantic = CompactEmbeddings.from_float(queries).similarity(CompactEmbeddings.from_float(references)).max(axis=1)
+        near = [
+            i for i, text in enumerate(probes)
+            if abs(semantic_weight * semantic[i] + fuzzy_weight * self.fuzzy_matching(text)
+                   + format_weight * self.format_analysis(text) - threshold) <= band
+        ]
         
-        return max(scores) if scores else 0.0
+        drift = score_drift(queries[near] if near else queries, references, self.embedding_dtype)
+        drift.update(probes=len(near) if near else len(probes), near_threshold=bool(near))
+        return drift, references
+
+    def set_embedding_dtype(self, dtype, placeholder_embeddings):
+        """Switch storage precision, rebuilding the placeholder matrix and dropping cached vectors"""
+        with self._cache_lock:
+            self.embedding_dtype = dtype
+            self.placeholder_embeddings = CompactEmbeddings.from_float(placeholder_embeddings, dtype)
+            self._embedding_cache.clear()
+
+    def clear_embedding_cache(self):
+        with self._cache_lock:
+            self._embedding_cache.clear()
+
+    def embedding_stats(self):
+        with self._cache_lock:
+            cached = list(self._embedding_cache.values())
+        return {
+            "dtype": self.embedding_dtype,
+            "placeholder_bytes": self.placeholder_embeddings.nbytes,
+            "cache_entries": len(cached),
+            "cache_bytes": sum(row.nbytes for row in cached)
+        }
 
     def detect_placeholder(self, text_json, semantic_weight=0.4, fuzzy_weight=0.3, format_weight=0.3, threshold=0.75):
         if not text_json:
@@ -179,33 +138,38 @@ class AdvancedPlaceholderDetector:
         
         texts = [item.get("text", "").strip() for item in text_json]
         indices = [item.get("index", i) for i, item in enumerate(text_json)]
+        items = list(zip(range(len(texts)), texts, indices))
+        
+        # Lexical stages, spread over the prescoring pool for very large documents
+        with request_trace.stage("prescore"):
+            prescored = None
+            if parallel_prescore.should_parallelize(len(items)):
+                prescored = parallel_prescore.prescore(LexicalPlaceholderScorer, items)
+            if prescored is None:
+                prescored = self.prescore(items)
+        
+        request_trace.annotate(candidates=len(prescored["candidates"]))
+        if prescored["exact"]:
+            request_trace.annotate(short_circuit="exact_match")
+            _, text, index, exact_score = prescored["exact"]
+            return {
+                "status_code": 200,
+                "data": {
+                    "company_name": text,
+                    "index": index,
+                    "similarity": exact_score,
+                    "confidence": "VERY_HIGH",
+                    "detection_method": "EXACT_PATTERN_MATCH"
+                }
+            }
+        
+        candidates = prescored["candidates"]
+        with request_trace.stage("semantic"):
+            semantic_scores = self.semantic_similarity([text for _, text, _, _, _ in candidates]) if candidates else []
         
         results = []
         
-        for i, text in enumerate(texts):
-            if not text:
-                continue
-            
-            if not self.is_standalone_text(text):
-                continue
-            
-            is_exact_match, exact_score = self.exact_pattern_match(text)
-            if is_exact_match:
-                return {
-                    "status_code": 200,
-                    "data": {
-                        "company_name": text,
-                        "index": indices[i],
-                        "similarity": exact_score,
-                        "confidence": "VERY_HIGH",
-                        "detection_method": "EXACT_PATTERN_MATCH"
-                    }
-                }
-            
-            semantic_score = self.semantic_similarity([text])[0]
-            fuzzy_score = self.fuzzy_matching(text)
-            format_score = self.format_analysis(text)
-            
+        for (_, text, index, fuzzy_score, format_score), semantic_score in zip(candidates, semantic_scores):
             combined_score = (
                 semantic_weight * semantic_score +
                 fuzzy_weight * fuzzy_score +
@@ -214,7 +178,7 @@ class AdvancedPlaceholderDetector:
             
             results.append({
                 "text": text,
-                "index": indices[i],
+                "index": index,
                 "semantic_score": semantic_score,
                 "fuzzy_score": fuzzy_score,
                 "format_score": format_score,
@@ -222,11 +186,13 @@ class AdvancedPlaceholderDetector:
             })
         
         if not results:
+            request_trace.annotate(short_circuit="no_candidates")
             return None
         
         best_result = max(results, key=lambda x: x["combined_score"])
         
         if best_result["combined_score"] < threshold:
+            request_trace.annotate(short_circuit="below_threshold")
             return None
         
         score = best_result["combined_score"]
@@ -255,50 +221,249 @@ class AdvancedPlaceholderDetector:
             }
         }
 
-# Initialize detector
-detector = AdvancedPlaceholderDetector()
+WARMUP_TEXT_JSON = [
+    {"text": "Welcome to our grand opening celebration.", "index": 0},
+    {"text": "Acme Studio", "index": 1},
+    {"text": "Company", "index": 2},
+    {"text": "[Your Company Name]", "index": 3}
+]
+
+def load_model():
+    """Import the transformer stack and load the encoder (slow; run off the import path)"""
+    # Size torch's thread pools for this worker before anything runs on them
+    cpu_planner.configure_torch()
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(MODEL_NAME)
+
+def _load_detector():
+    return AdvancedPlaceholderDetector(
+        load_model(),
+        embedding_dtype=Config.EMBEDDING_DTYPE,
+        cache_size=Config.EMBEDDING_CACHE_SIZE
+    )
+
+def _drift_probe_texts():
+    """Texts from the labelled evaluation corpus plus the warm-up document"""
+    from utils.detector_eval import load_corpus
+
+    texts = [item["text"] for item in WARMUP_TEXT_JSON]
+    try:
+        for document in load_corpus():
+            texts.extend(item.get("text", "").strip() for item in document["text_json"])
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Evaluation corpus unavailable for drift probes: {str(e)}")
+    return texts
+
+def _warmup_detector(detector):
+    """Run representative inferences so the first real request does not pay for lazy init"""
+    import torch
+
+    latencies = []
+    for _ in range(Config.MODEL_WARMUP_ROUNDS):
+        started = time.perf_counter()
+        detector.detect_placeholder(WARMUP_TEXT_JSON)
+        detector.semantic_similarity([item["text"] for item in WARMUP_TEXT_JSON])
+        latencies.append(round((time.perf_counter() - started) * 1000, 2))
+
+    # Drift is measured per unit of semantic weight on probes scoring near the
+    # threshold; callers may pass any semantic_weight up to 1, so that is the bound
+    drift, references = detector.measure_embedding_drift(_drift_probe_texts())
+    if drift["max_score_drift"] > Config.EMBEDDING_MAX_SCORE_DRIFT:
+        logger.warning(
+            f"{detector.embedding_dtype} embeddings drift {round(drift['max_score_drift'], 6)} per unit of "
+            f"semantic weight near threshold exceeds {Config.EMBEDDING_MAX_SCORE_DRIFT}; falling back to float32"
+        )
+        detector.set_embedding_dtype('float32', references)
+
+    return {
+        "model": MODEL_NAME,
+        "warmup_latencies_ms": latencies,
+        "embedding_drift": drift,
+        "embeddings": detector.embedding_stats(),
+        "torch_threads": {
+            "intra_op": torch.get_num_threads(),
+            "inter_op": torch.get_num_interop_threads()
+        }
+    }
+
+# Per-worker admission control in front of /detect-company-name
+def _open_host_load():
+    """Host-wide in-flight table; without it, queue time is only visible through X-Request-Start"""
+    if not Config.ADMISSION_HOST_LOAD_PATH:
+        return None
+    try:
+        return admission.HostLoad(Config.ADMISSION_HOST_LOAD_PATH)
+    except (OSError, ValueError) as e:
+        logger.error(f"Host load table unavailable ({str(e)}); overload shedding needs X-Request-Start from the proxy")
+        return None
+
+def _open_client_buckets():
+    """Host-wide per-client buckets; without them each worker grants a client the full rate"""
+    if not Config.ADMISSION_CLIENT_BUCKETS_PATH or Config.ADMISSION_CLIENT_RATE <= 0:
+        return None
+    try:
+        return admission.HostClientBuckets(Config.ADMISSION_CLIENT_BUCKETS_PATH)
+    except (OSError, ValueError) as e:
+        logger.error(f"Client bucket table unavailable ({str(e)}); client rate limits apply per worker")
+        return None
+
+admission_controller = admission.register('detect-company-name', admission.AdmissionController(
+    budget_seconds=Config.ADMISSION_LATENCY_BUDGET,
+    base_seconds=Config.ADMISSION_BASE_SECONDS,
+    seconds_per_item=Config.ADMISSION_SECONDS_PER_ITEM,
+    seconds_per_kb=Config.ADMISSION_SECONDS_PER_KB,
+    max_defer_seconds=Config.ADMISSION_MAX_DEFER,
+    client_rate=Config.ADMISSION_CLIENT_RATE,
+    client_burst=Config.ADMISSION_CLIENT_BURST,
+    host_load=_open_host_load(),
+    client_buckets=_open_client_buckets()
+))
+_warned_no_queue_signal = False
+
+def _warn_no_queue_signal():
+    """Say once per worker that overload shedding is blind to the listen backlog"""
+    global _warned_no_queue_signal
+    if not _warned_no_queue_signal:
+        _warned_no_queue_signal = True
+        logger.warning("No X-Request-Start header and no host load table: admission cannot see backlog wait")
+
+def _embedding_memory():
+    """Embedding matrix and cache sizes for the memory monitor (empty until the model is ready)"""
+    if not detector_lifecycle.is_ready:
+        return {}
+    return detector_lifecycle.get().embedding_stats()
+
+# Model is loaded by the startup hook (see main.create_app) or on first use
+detector_lifecycle = model_lifecycle.register(
+    model_lifecycle.ModelLifecycle('company_name_detector', _load_detector, warmup=_warmup_detector)
+)
+memory_monitor.register_probe('embeddings', _embedding_memory)
+
+def _admission_rejected(rejection):
+    """Render an admission Rejection as a fast error response"""
+    headers = {"Retry-After": str(rejection.retry_after)} if rejection.retry_after else {}
+    return payload_codec.respond({
+        "status_code": rejection.status_code,
+        "error": rejection.error,
+        "estimated_seconds": round(rejection.estimated_seconds, 3)
+    }, rejection.status_code, headers)
+
+@bp.before_request
+def _begin_request_trace():
+    """Open the request trace: stage timings always, allocation peaks while memory tracing is on"""
+    tracing = memory_monitor.is_tracing()
+    if tracing:
+        g.memory_rss_before = memory_monitor.rss_bytes()
+    request_trace.begin(request.endpoint, trace_memory=tracing)
+
+@bp.teardown_request
+def _end_request_trace(exc):
+    trace = request_trace.end()
+    if trace is not None and trace.trace_memory:
+        memory_monitor.record_request(trace, g.pop('memory_rss_before', None))
+
+@bp.after_request
+def _capture_slow_request(response):
+    """Keep an exemplar of requests slower than SLOW_REQUEST_MS (see /logs/slow)"""
+    request_trace.annotate(status=response.status_code)
+    slow_requests.capture(request_trace.current())
+    return response
 
 @bp.route('/detect-company-name', methods=['POST'])
 def detect_placeholder():
     try:
-        content = request.get_json()
-        
-        if not content:
+        queued = admission.queued_seconds(request.headers.get('X-Request-Start'))
+        if 'X-Request-Start' not in request.headers and admission_controller.host_load is None:
+            _warn_no_queue_signal()
+        client_id = request.headers.get(Config.ADMISSION_CLIENT_HEADER) or request.remote_addr
+        
+        # Lower bound from body size alone: refuse hopeless payloads before parsing them
+        if request.content_length and admission_controller.raw_estimate(request.content_length, 0) > Config.ADMISSION_LATENCY_BUDGET:
+            request_trace.annotate(short_circuit="admission")
+            return _admission_rejected(admission_controller.admit(request.content_length, 0))
+        
+        try:
+            with request_trace.stage("decode"):
+                content, payload_bytes = payload_codec.decode_request()
+        except payload_codec.PayloadError as e:
+            request_trace.annotate(short_circuit="decode")
+            logger.error(f"Invalid request body: {e.message}")
+            return payload_codec.respond({"status_code": e.status_code, "error": e.message}, e.status_code)
+        
+        if not content or not isinstance(content, dict):
             logger.error("No JSON data provided")
-            return jsonify({"status_code": 400, "error": "No JSON data provided"}), 400
+            return payload_codec.respond({"status_code": 400, "error": "No JSON data provided"}, 400)
         
         text_json = content.get("text_json", [])
         
         if not isinstance(text_json, list):
             logger.error("text_json must be a list")
-            return jsonify({"status_code": 400, "error": "text_json must be a list"}), 400
+            return payload_codec.respond({"status_code": 400, "error": "text_json must be a list"}, 400)
+        
+        request_trace.annotate(
+            wire_bytes=request.content_length,
+            payload_bytes=payload_bytes,
+            items=len(text_json),
+            queued_ms=round(queued * 1000, 3)
+        )
         
         threshold = content.get("threshold", 0.75)
         semantic_weight = content.get("semantic_weight", 0.4)
         fuzzy_weight = content.get("fuzzy_weight", 0.3)
         format_weight = content.get("format_weight", 0.3)
         
-        result = detector.detect_placeholder(
-            text_json,
-            semantic_weight=semantic_weight,
-            fuzzy_weight=fuzzy_weight,
-            format_weight=format_weight,
-            threshold=threshold
-        )
+        with request_trace.stage("admission"):
+            ticket = admission_controller.admit(payload_bytes, len(text_json), client_id=client_id, queued=queued)
+        if isinstance(ticket, admission.Rejection):
+            request_trace.annotate(short_circuit="admission")
+            logger.warning(f"Admission rejected ({ticket.status_code}): {len(text_json)} items, client {client_id}")
+            return _admission_rejected(ticket)
+        
+        with ticket:
+            with request_trace.stage("model_wait"):
+                detector = detector_lifecycle.get(timeout=Config.MODEL_READY_TIMEOUT)
+            if detector is None:
+                ticket.learn = False
+                request_trace.annotate(short_circuit="model_not_ready")
+                logger.warning(f"Detector not ready ({detector_lifecycle.state}), rejecting request")
+                return payload_codec.respond({
+                    "status_code": 503,
+                    "error": "Model is not ready",
+                    "model_state": detector_lifecycle.state
+                }, 503, {"Retry-After": str(Config.MODEL_RETRY_AFTER)})
+            
+            # Time only the detection itself; a cold-start wait says nothing about request cost
+            ticket.start_clock()
+            result = detector.detect_placeholder(
+                text_json,
+                semantic_weight=semantic_weight,
+                fuzzy_weight=fuzzy_weight,
+                format_weight=format_weight,
+                threshold=threshold
+            )
         
         if result:
-            return jsonify(result), 200
+            return payload_codec.respond(result, 200)
         else:
             logger.info("No placeholder match found")
-            return jsonify({
+            return payload_codec.respond({
                 "status_code": 201,
                 "error": "No strong placeholder match found",
                 "message": "No standalone company name placeholders detected above threshold"
-            }), 200
+            }, 200)
+    
+    except parallel_prescore.PrescoreTimeout as e:
+        request_trace.annotate(short_circuit="prescore_timeout")
+        logger.error(f"Company name detection timed out: {str(e)}")
+        return payload_codec.respond({
+            "status_code": 503,
+            "error": "Document too large to score in time"
+        }, 503)
     
     except Exception as e:
         logger.error(f"Company name detection error: {str(e)}")
-        return jsonify({
+        return payload_codec.respond({
             "status_code": 500,
             "error": f"Internal server error: {str(e)}"
-        }), 500
+        }, 500)
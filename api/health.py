@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 from datetime import datetime
 from logger_config import Logger
+from utils import admission, model_lifecycle, parallel_prescore
 
 bp = Blueprint('health', __name__)
 logger = Logger.get_logger()
@@ -23,6 +24,24 @@ def health_check():
             "error": str(e)
         }), 500
 
+@bp.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 200 only once every model is loaded and warmed up"""
+    try:
+        ready, models = model_lifecycle.readiness()
+        return jsonify({
+            "status": "ready" if ready else "not_ready",
+            "timestamp": datetime.now().isoformat(),
+            "models": models
+        }), 200 if ready else 503
+
+    except Exception as e:
+        logger.error(f"Readiness check failed: {str(e)}")
+        return jsonify({
+            "status": "not_ready",
+            "error": str(e)
+        }), 503
+
 @bp.route('/status', methods=['GET'])
 def status_check():
     """Detailed status endpoint"""
@@ -40,7 +59,11 @@ def status_check():
                 "service_status": "running",
                 "timestamp": datetime.now().isoformat(),
                 "recent_logs_summary": log_counts,
-                "total_recent_logs": len(recent_logs)
+                "total_recent_logs": len(recent_logs),
+                "log_queue": Logger.get_queue_stats(),
+                "models": model_lifecycle.readiness()[1],
+                "admission": admission.all_stats(),
+                "parallel_prescore": parallel_prescore.stats()
             }
         }), 200
 
@@ -1,23 +1,32 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+import json
+import time
+from config import Config
 from logger_config import Logger
+from utils import slow_requests
+from utils.admin_auth import require_admin_token
 
 bp = Blueprint('logs_viewer', __name__)
 logger = Logger.get_logger()
 
 @bp.route('/logs', methods=['GET'])
 def get_logs():
-    """Get application logs"""
+    """Get application logs from all workers
+
+    Pass the returned `cursor` back as `since` to fetch only newer entries.
+    """
     try:
         # Get query parameters
         limit = request.args.get('limit', 100, type=int)
         level = request.args.get('level', None, type=str)
+        since = request.args.get('since', 0, type=int)
 
         # Validate limit
         if limit > 1000:
             limit = 1000
 
-        # Get logs from memory
-        logs = Logger.get_logs(limit=limit, level=level)
+        # Get logs from the shared buffer
+        logs, cursor, info = Logger.read_logs(since=since, limit=limit, level=level)
 
         return jsonify({
             "status_code": 200,
@@ -25,7 +34,11 @@ def get_logs():
                 "logs": logs,
                 "total": len(logs),
                 "limit": limit,
-                "level_filter": level
+                "level_filter": level,
+                "since": since,
+                "cursor": cursor,
+                "missed": info['missed'],
+                "reset": info['reset']
             }
         }), 200
 
@@ -36,6 +49,96 @@ def get_logs():
             "error": f"Failed to retrieve logs: {str(e)}"
         }), 500
 
+@bp.route('/logs/stream', methods=['GET'])
+@require_admin_token
+def stream_logs():
+    """Tail application logs as server-sent events
+
+    Each event carries the entry's seq as its id, so a reconnecting client
+    (Last-Event-ID) or poller (since) resumes without gaps. The stream ends
+    after `timeout` seconds so it never trips the worker timeout. A stream
+    holds a sync worker for its whole duration, so it is admin-only.
+    """
+    try:
+        level = request.args.get('level', None, type=str)
+        since = request.args.get('since', None, type=int)
+        if since is None:
+            since = request.headers.get('Last-Event-ID', None, type=int)
+        timeout = request.args.get('timeout', Config.LOG_STREAM_MAX_SECONDS, type=float)
+        timeout = max(0.0, min(timeout, Config.LOG_STREAM_MAX_SECONDS))
+
+        # Without a cursor, tail from the current end of the buffer
+        if since is None:
+            _, since, _ = Logger.read_logs(since=0, limit=1)
+
+        def generate(cursor):
+            deadline = time.monotonic() + timeout
+            while True:
+                logs, cursor, info = Logger.read_logs(since=cursor, limit=1000, level=level)
+                if info['missed'] or info['reset']:
+                    yield f"event: gap\ndata: {json.dumps(info)}\n\n"
+                for log in logs:
+                    yield f"id: {log['seq']}\ndata: {json.dumps(log)}\n\n"
+                if time.monotonic() >= deadline:
+                    break
+                if not logs:
+                    time.sleep(Config.LOG_STREAM_POLL_INTERVAL)
+            yield f"event: end\ndata: {json.dumps({'cursor': cursor})}\n\n"
+
+        return Response(
+            stream_with_context(generate(since)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    except Exception as e:
+        logger.error(f"Error streaming logs: {str(e)}")
+        return jsonify({
+            "status_code": 500,
+            "error": f"Failed to stream logs: {str(e)}"
+        }), 500
+
+@bp.route('/logs/slow', methods=['GET'])
+def get_slow_requests():
+    """Get slow-request exemplars from all workers
+
+    Each exemplar breaks one request above SLOW_REQUEST_MS down by stage.
+    Pass the returned `cursor` back as `since` to fetch only newer ones.
+    """
+    try:
+        limit = request.args.get('limit', 100, type=int)
+        since = request.args.get('since', 0, type=int)
+        min_ms = request.args.get('min_ms', 0, type=float)
+
+        # Validate limit
+        if limit > 1000:
+            limit = 1000
+
+        exemplars, cursor, info = slow_requests.read(since=since, limit=limit)
+        if min_ms:
+            exemplars = [exemplar for exemplar in exemplars if exemplar['total_ms'] >= min_ms]
+
+        return jsonify({
+            "status_code": 200,
+            "data": {
+                "exemplars": exemplars,
+                "total": len(exemplars),
+                "limit": limit,
+                "threshold_ms": Config.SLOW_REQUEST_MS,
+                "since": since,
+                "cursor": cursor,
+                "missed": info['missed'],
+                "reset": info['reset']
+            }
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error retrieving slow requests: {str(e)}")
+        return jsonify({
+            "status_code": 500,
+            "error": f"Failed to retrieve slow requests: {str(e)}"
+        }), 500
+
 @bp.route('/logs/levels', methods=['GET'])
 def get_log_levels():
     """Get available log levels"""
@@ -0,0 +1,89 @@
+from flask import Blueprint, jsonify, request
+from logger_config import Logger
+from utils import memory_monitor
+from utils.admin_auth import require_admin_token
+
+bp = Blueprint('memory_stats', __name__)
+logger = Logger.get_logger()
+
+def _logging_memory():
+    return dict(Logger.get_queue_stats(), buffer=Logger.get_buffer_stats())
+
+memory_monitor.register_probe('logging', _logging_memory)
+
+# Periodic RSS/heap sampling for this worker (and memory-based recycling under gunicorn)
+memory_monitor.start()
+
+@bp.route('/debug/memory', methods=['GET'])
+@require_admin_token
+def get_memory():
+    """Memory history for this worker, or the latest samples of every worker with scope=all"""
+    try:
+        scope = request.args.get('scope', 'worker', type=str)
+        if scope not in ('all', 'worker'):
+            return jsonify({"status_code": 400, "error": "scope must be 'all' or 'worker'"}), 400
+
+        if scope == 'all':
+            data = {"workers": memory_monitor.all_workers()}
+        else:
+            data = memory_monitor.worker_report()
+
+        return jsonify({"status_code": 200, "data": data}), 200
+
+    except Exception as e:
+        logger.error(f"Error reading memory stats: {str(e)}")
+        return jsonify({
+            "status_code": 500,
+            "error": f"Failed to read memory stats: {str(e)}"
+        }), 500
+
+@bp.route('/debug/memory/tracing', methods=['POST'])
+@require_admin_token
+def set_tracing():
+    """Turn allocation tracing on or off in the worker that serves this request"""
+    try:
+        enabled = request.args.get('enabled', 'true', type=str).lower() == 'true'
+        frames = request.args.get('frames', None, type=int)
+        if frames is not None and not 1 <= frames <= 100:
+            return jsonify({"status_code": 400, "error": "frames must be between 1 and 100"}), 400
+
+        memory_monitor.set_tracing(enabled, frames)
+        status = memory_monitor.tracing_status()
+        logger.info(f"Memory tracing {'enabled' if status['tracing'] else 'disabled'} in worker {status['worker']}")
+        return jsonify({"status_code": 200, "data": status}), 200
+
+    except Exception as e:
+        logger.error(f"Error toggling memory tracing: {str(e)}")
+        return jsonify({
+            "status_code": 500,
+            "error": f"Failed to toggle memory tracing: {str(e)}"
+        }), 500
+
+@bp.route('/debug/memory/snapshot', methods=['GET'])
+@require_admin_token
+def get_snapshot():
+    """Top allocation sites in this worker (requires tracing)"""
+    try:
+        top = request.args.get('top', 25, type=int)
+        group_by = request.args.get('group_by', 'lineno', type=str)
+        compare = request.args.get('compare', 'false', type=str).lower() == 'true'
+
+        if group_by not in ('lineno', 'filename', 'traceback'):
+            return jsonify({"status_code": 400, "error": "group_by must be lineno, filename or traceback"}), 400
+
+        snapshot = memory_monitor.top_allocations(max(1, min(top, 500)), group_by, compare)
+        if snapshot is None:
+            return jsonify({
+                "status_code": 409,
+                "error": "Memory tracing is off in this worker; enable it with POST /debug/memory/tracing"
+            }), 409
+
+        snapshot.update(memory_monitor.tracing_status())
+        return jsonify({"status_code": 200, "data": snapshot}), 200
+
+    except Exception as e:
+        logger.error(f"Error taking memory snapshot: {str(e)}")
+        return jsonify({
+            "status_code": 500,
+            "error": f"Failed to take memory snapshot: {str(e)}"
+        }), 500
@@ -0,0 +1,93 @@
+from flask import Blueprint, Response, jsonify, request
+from config import Config
+from logger_config import Logger
+from utils import sampling_profiler
+from utils.admin_auth import require_admin_token
+
+bp = Blueprint('profiler', __name__)
+logger = Logger.get_logger()
+
+# Arm the on-demand trigger for this worker; no sampling happens until requested
+sampling_profiler.install()
+
+@bp.route('/debug/profile', methods=['POST'])
+@require_admin_token
+def start_profile():
+    """Start sampling this worker (and by default all workers) for N seconds of live traffic"""
+    try:
+        seconds = request.args.get('seconds', 10, type=float)
+        interval_ms = request.args.get('interval_ms', Config.PROFILE_INTERVAL_MS, type=float)
+        scope = request.args.get('scope', 'all', type=str)
+
+        if not 0 < seconds <= Config.PROFILE_MAX_SECONDS:
+            return jsonify({
+                "status_code": 400,
+                "error": f"seconds must be between 0 and {Config.PROFILE_MAX_SECONDS}"
+            }), 400
+        if interval_ms < 1:
+            return jsonify({"status_code": 400, "error": "interval_ms must be at least 1"}), 400
+        if scope not in ('all', 'worker'):
+            return jsonify({"status_code": 400, "error": "scope must be 'all' or 'worker'"}), 400
+
+        session = sampling_profiler.start_session(seconds, interval_ms / 1000.0, all_workers=(scope == 'all'))
+        if session is None:
+            return jsonify({"status_code": 409, "error": "A profile is already running in this worker"}), 409
+
+        logger.info(f"Profile {session['profile_id']} started for {seconds}s on workers {session['workers']}")
+        return jsonify({
+            "status_code": 202,
+            "data": {
+                "profile_id": session["profile_id"],
+                "seconds": seconds,
+                "interval_ms": interval_ms,
+                "workers": session["workers"],
+                "result_url": f"{request.script_root}{Config.API_PREFIX}/debug/profile/{session['profile_id']}"
+            }
+        }), 202
+
+    except Exception as e:
+        logger.error(f"Error starting profile: {str(e)}")
+        return jsonify({
+            "status_code": 500,
+            "error": f"Failed to start profile: {str(e)}"
+        }), 500
+
+@bp.route('/debug/profile/<profile_id>', methods=['GET'])
+@require_admin_token
+def get_profile(profile_id):
+    """Get a profile as collapsed stacks (default) or a JSON summary"""
+    try:
+        output_format = request.args.get('format', 'collapsed', type=str)
+        split_workers = request.args.get('split_workers', 'false', type=str).lower() == 'true'
+
+        session = sampling_profiler.load_session(profile_id)
+        if session is None:
+            return jsonify({"status_code": 404, "error": "Unknown profile id"}), 404
+
+        if output_format == 'json':
+            return jsonify({
+                "status_code": 200,
+                "data": {
+                    "profile_id": profile_id,
+                    "complete": session["complete"],
+                    "workers": session["workers"],
+                    "reported_workers": session["reported_workers"],
+                    "samples": sum(result["samples"] for result in session["results"]),
+                    "collapsed": sampling_profiler.collapsed(session["results"], split_workers)
+                }
+            }), 200
+
+        status = 200 if session["complete"] else 202
+        return Response(
+            sampling_profiler.collapsed(session["results"], split_workers),
+            status=status,
+            mimetype='text/plain',
+            headers={"X-Profile-Complete": str(session["complete"]).lower()}
+        )
+
+    except Exception as e:
+        logger.error(f"Error retrieving profile: {str(e)}")
+        return jsonify({
+            "status_code": 500,
+            "error": f"Failed to retrieve profile: {str(e)}"
+        }), 500
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,8 +15,91 @@ class Config:
     # API Configuration
     API_PREFIX = os.getenv('API_PREFIX', '/api/v1')
 
+    # Model lifecycle
+    MODEL_LOAD_MODE = os.getenv('MODEL_LOAD_MODE', 'background')  # background, eager or lazy
+    MODEL_WARMUP_ROUNDS = int(os.getenv('MODEL_WARMUP_ROUNDS', 3))
+    MODEL_READY_TIMEOUT = float(os.getenv('MODEL_READY_TIMEOUT', 20))  # seconds a request waits for a cold model
+    MODEL_RETRY_AFTER = int(os.getenv('MODEL_RETRY_AFTER', 5))
+    MODEL_RETRY_BACKOFF = float(os.getenv('MODEL_RETRY_BACKOFF', 5))  # first retry after a failed load, doubling
+    MODEL_RETRY_BACKOFF_MAX = float(os.getenv('MODEL_RETRY_BACKOFF_MAX', 300))
+
+    # Request/response codecs (gzip/zstd, JSON/MessagePack)
+    MAX_DECOMPRESSED_BYTES = int(os.getenv('MAX_DECOMPRESSED_BYTES', 50 * 1024 * 1024))
+    RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESS_MIN_BYTES', 1024))
+
+    # Embedding storage: float32, float16 or int8 (per-vector scales)
+    EMBEDDING_DTYPE = os.getenv('EMBEDDING_DTYPE', 'float16')
+    EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', 4096))  # 0 disables the text embedding cache
+    EMBEDDING_MAX_SCORE_DRIFT = float(os.getenv('EMBEDDING_MAX_SCORE_DRIFT', 0.005))
+
+    # Parallel lexical prescoring of very large documents (pool processes per worker; 0 disables)
+    PARALLEL_PRESCORE_PROCESSES = int(os.getenv('PARALLEL_PRESCORE_PROCESSES', 0))
+    PARALLEL_PRESCORE_MIN_ITEMS = int(os.getenv('PARALLEL_PRESCORE_MIN_ITEMS', 2000))
+    PARALLEL_PRESCORE_MIN_CHUNK = int(os.getenv('PARALLEL_PRESCORE_MIN_CHUNK', 250))
+    PARALLEL_PRESCORE_TIMEOUT = float(os.getenv('PARALLEL_PRESCORE_TIMEOUT', 15))
+
+    # Admission control for /detect-company-name (keep the budget below the gunicorn timeout)
+    ADMISSION_LATENCY_BUDGET = float(os.getenv('ADMISSION_LATENCY_BUDGET', 20))
+    ADMISSION_BASE_SECONDS = float(os.getenv('ADMISSION_BASE_SECONDS', 0.01))
+    ADMISSION_SECONDS_PER_ITEM = float(os.getenv('ADMISSION_SECONDS_PER_ITEM', 0.002))
+    ADMISSION_SECONDS_PER_KB = float(os.getenv('ADMISSION_SECONDS_PER_KB', 0.0005))
+    ADMISSION_MAX_DEFER = float(os.getenv('ADMISSION_MAX_DEFER', 0.25))
+    # Shared in-flight table used to estimate backlog wait when the proxy sends no X-Request-Start; empty disables
+    ADMISSION_HOST_LOAD_PATH = os.getenv(
+        'ADMISSION_HOST_LOAD_PATH',
+        os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), f'flask_api_admission.{PORT}.buf')
+    )
+    ADMISSION_CLIENT_HEADER = os.getenv('ADMISSION_CLIENT_HEADER', 'X-Client-Id')
+    ADMISSION_CLIENT_RATE = float(os.getenv('ADMISSION_CLIENT_RATE', 0))  # cost-seconds per second; 0 disables
+    ADMISSION_CLIENT_BURST = float(os.getenv('ADMISSION_CLIENT_BURST', 10))
+    # Shared per-client buckets so the client rate holds across all workers; empty falls back to per-worker buckets
+    ADMISSION_CLIENT_BUCKETS_PATH = os.getenv(
+        'ADMISSION_CLIENT_BUCKETS_PATH',
+        os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), f'flask_api_admission_clients.{PORT}.buf')
+    )
+
+    # Admin / debug endpoints (disabled while ADMIN_TOKEN is empty)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'flask_api_profiles'))
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 60))
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+    PROFILE_KEEP_SESSIONS = int(os.getenv('PROFILE_KEEP_SESSIONS', 20))
+
+    # Memory accounting (per-worker sampling; tracemalloc tracing is off unless enabled)
+    MEMORY_SAMPLE_INTERVAL = float(os.getenv('MEMORY_SAMPLE_INTERVAL', 30))  # 0 disables the sampler
+    MEMORY_HISTORY_SIZE = int(os.getenv('MEMORY_HISTORY_SIZE', 120))
+    MEMORY_REQUEST_HISTORY = int(os.getenv('MEMORY_REQUEST_HISTORY', 50))
+    MEMORY_TRACING = os.getenv('MEMORY_TRACING', 'False').lower() == 'true'
+    MEMORY_TRACE_FRAMES = int(os.getenv('MEMORY_TRACE_FRAMES', 1))
+    WORKER_MAX_RSS_MB = int(os.getenv('WORKER_MAX_RSS_MB', 0))  # recycle a worker above this RSS; 0 disables
+
     # Logging Configuration
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'app.log')
     LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10485760))  # 10MB
     LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    LOG_QUEUE_OVERFLOW = os.getenv('LOG_QUEUE_OVERFLOW', 'drop')  # drop, drop_oldest or block
+    LOG_QUEUE_BLOCK_TIMEOUT = float(os.getenv('LOG_QUEUE_BLOCK_TIMEOUT', 0.05))
+    LOG_SHUTDOWN_TIMEOUT = float(os.getenv('LOG_SHUTDOWN_TIMEOUT', 5))
+
+    # Host-wide log buffer shared by all workers (memory-mapped file)
+    LOG_BUFFER_ENABLED = os.getenv('LOG_BUFFER_ENABLED', 'True').lower() == 'true'
+    LOG_BUFFER_PATH = os.getenv(
+        'LOG_BUFFER_PATH',
+        # Per port, so services on one host never share (and resize) each other's buffer
+        os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), f'flask_api_logs.{PORT}.buf')
+    )
+    LOG_BUFFER_SLOTS = int(os.getenv('LOG_BUFFER_SLOTS', 8192))
+    LOG_BUFFER_SLOT_SIZE = int(os.getenv('LOG_BUFFER_SLOT_SIZE', 1024))
+    LOG_STREAM_MAX_SECONDS = int(os.getenv('LOG_STREAM_MAX_SECONDS', 25))  # keep below gunicorn timeout
+    LOG_STREAM_POLL_INTERVAL = float(os.getenv('LOG_STREAM_POLL_INTERVAL', 0.5))
+
+    # Slow-request exemplars for /detect-company-name (kept in a second host-wide buffer)
+    SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 1000))  # 0 disables capture
+    SLOW_REQUEST_BUFFER_PATH = os.getenv(
+        'SLOW_REQUEST_BUFFER_PATH',
+        os.path.join(os.path.dirname(LOG_BUFFER_PATH), f'flask_api_slow_requests.{PORT}.buf')
+    )
+    SLOW_REQUEST_SLOTS = int(os.getenv('SLOW_REQUEST_SLOTS', 512))
+    SLOW_REQUEST_SLOT_SIZE = int(os.getenv('SLOW_REQUEST_SLOT_SIZE', 4096))
@@ -3,19 +3,28 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from utils import cpu_planner
+
 # Server socket
 bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5003')}"
-backlog = 2048
+# Keep the listen backlog short: queued requests are invisible to admission control
+# unless the proxy sends X-Request-Start, and they time out if the queue runs long
+backlog = int(os.getenv('BACKLOG', 64))
 
 # Worker processes
-workers = 4  # Adjust based on your server's CPU cores (2*cores + 1 is recommended)
+# Sized from the CPU set and cgroup quota so workers * torch threads fits the
+# host; override with WEB_WORKERS / TORCH_INTRA_OP_THREADS (see utils/cpu_planner.py)
+cpu_plan = cpu_planner.plan()
+workers = cpu_plan.workers
 worker_class = 'sync'
 worker_connections = 1000
 timeout = 30
 keepalive = 2
 
-# Restart workers after this many requests, to help prevent memory leaks
-max_requests = 1000
+# Restart workers after this many requests, to help prevent memory leaks.
+# With WORKER_MAX_RSS_MB set (see config.py), workers are also recycled by
+# memory; MAX_REQUESTS=0 then leaves memory as the only trigger
+max_requests = int(os.getenv('MAX_REQUESTS', 1000))
 max_requests_jitter = 50
 
 # Logging
@@ -39,6 +48,29 @@ reload = os.getenv('FLASK_ENV') == 'development'
 reload_engine = 'auto'
 reload_extra_files = []
 
+# Server hooks
+def on_starting(server):
+    server.log.info(f"CPU plan: {cpu_plan.to_dict()}")
+
+def pre_fork(server, worker):
+    """Assign the worker a CPU slot (runs in the master)"""
+    cpu_planner.assign_slot(server, worker)
+
+def post_fork(server, worker):
+    """Limit thread pools and optionally pin cores before the app (and torch) is imported"""
+    cpu_planner.apply_to_worker(server, worker)
+
+    # Recycle gracefully (finish the current request, then exit) when RSS exceeds WORKER_MAX_RSS_MB
+    from utils import memory_monitor
+    memory_monitor.enable_recycling(lambda: setattr(worker, 'alive', False))
+
+def worker_exit(server, worker):
+    """Stop the prescoring pool and flush the background log queue before the worker goes away"""
+    from logger_config import Logger
+    from utils import parallel_prescore
+    parallel_prescore.shutdown()
+    Logger.shutdown()
+
 # SSL (if needed)
 # keyfile = '/path/to/keyfile'
 # certfile = '/path/to/certfile'
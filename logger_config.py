@@ -1,13 +1,20 @@
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
+import threading
 from datetime import datetime
 from config import Config
+from utils.shared_log_buffer import SharedLogBuffer, LocalLogBuffer, read_since
 
 class Logger:
     _instance = None
     _logger = None
-    _logs = []
+    _buffer = None
+    _queue = None
+    _listener = None
+    _queue_handler = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -17,11 +24,18 @@ class Logger:
 
     @classmethod
     def _setup_logger(cls):
-        """Setup logger configuration"""
+        """Setup logger configuration
+
+        Request threads only enqueue records. A background listener thread does
+        the formatting, file writes and rotation so a slow log volume never
+        shows up as request latency.
+        """
         cls._logger = logging.getLogger('flask_api')
         cls._logger.setLevel(getattr(logging, Config.LOG_LEVEL))
+        cls._logger.propagate = False
 
         # Clear existing handlers
+        cls.shutdown()
         cls._logger.handlers.clear()
 
         # Create formatters
@@ -29,23 +43,142 @@ class Logger:
             '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(message)s'
         )
 
-        # File handler with rotation
+        # File handler with rotation (runs on the listener thread)
         file_handler = logging.handlers.RotatingFileHandler(
             Config.LOG_FILE,
             maxBytes=Config.LOG_MAX_BYTES,
             backupCount=Config.LOG_BACKUP_COUNT
         )
         file_handler.setFormatter(detailed_formatter)
-        cls._logger.addHandler(file_handler)
 
-        # Console handler
+        # Console handler (runs on the listener thread)
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(detailed_formatter)
-        cls._logger.addHandler(console_handler)
 
-        # Custom handler to store logs in memory
+        # Bounded queue between request threads and the listener
+        cls._queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+        cls._queue_handler = cls.BoundedQueueHandler(
+            cls._queue,
+            overflow=Config.LOG_QUEUE_OVERFLOW,
+            block_timeout=Config.LOG_QUEUE_BLOCK_TIMEOUT
+        )
+        cls._logger.addHandler(cls._queue_handler)
+
+        # Custom handler to store logs in the host-wide shared buffer
+        # (also on the listener thread, since writes take a cross-process lock)
+        cls._buffer = cls._create_buffer()
         memory_handler = cls.MemoryHandler()
-        cls._logger.addHandler(memory_handler)
+
+        cls._listener = cls.BackgroundListener(
+            cls._queue, file_handler, console_handler, memory_handler,
+            respect_handler_level=True
+        )
+        cls._listener.start()
+
+    @classmethod
+    def _create_buffer(cls):
+        """Open the shared log buffer, falling back to a per-process one"""
+        if Config.LOG_BUFFER_ENABLED:
+            try:
+                return SharedLogBuffer(
+                    Config.LOG_BUFFER_PATH,
+                    slot_count=Config.LOG_BUFFER_SLOTS,
+                    slot_size=Config.LOG_BUFFER_SLOT_SIZE
+                )
+            except (OSError, ValueError) as e:
+                logging.getLogger('flask_api.setup').warning(
+                    f"Shared log buffer unavailable, using per-worker buffer: {str(e)}"
+                )
+        return LocalLogBuffer(capacity=1000)
+
+    class BoundedQueueHandler(logging.handlers.QueueHandler):
+        """Queue handler with an explicit policy for a full queue.
+
+        Policies:
+            drop         - discard the new record (default, never blocks)
+            drop_oldest  - discard the oldest queued record to make room
+            block        - wait up to block_timeout seconds, then discard
+        """
+
+        OVERFLOW_POLICIES = ('drop', 'drop_oldest', 'block')
+
+        def __init__(self, log_queue, overflow='drop', block_timeout=0.05):
+            super().__init__(log_queue)
+            if overflow not in self.OVERFLOW_POLICIES:
+                raise ValueError(f"Unknown log queue overflow policy: {overflow}")
+            self.overflow = overflow
+            self.block_timeout = block_timeout
+            self.dropped = 0
+            self._unreported = 0
+            self._drop_lock = threading.Lock()
+
+        def enqueue(self, record):
+            if self._unreported:
+                self._report_drops()
+
+            try:
+                if self.overflow == 'block':
+                    self.queue.put(record, timeout=self.block_timeout)
+                else:
+                    self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                pass
+
+            if self.overflow == 'drop_oldest':
+                try:
+                    self.queue.get_nowait()
+                    self.queue.put_nowait(record)
+                except (queue.Empty, queue.Full):
+                    pass
+
+            self._count_drop()
+
+        def _count_drop(self):
+            with self._drop_lock:
+                self.dropped += 1
+                self._unreported += 1
+
+        def _report_drops(self):
+            """Enqueue a single warning summarising records dropped since the last report"""
+            with self._drop_lock:
+                count = self._unreported
+                if not count:
+                    return
+                self._unreported = 0
+
+            record = logging.LogRecord(
+                'flask_api', logging.WARNING, __file__, 0,
+                f"Log queue overflow: dropped {count} record(s)", None, None,
+                func='enqueue'
+            )
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                with self._drop_lock:
+                    self._unreported += count
+
+    class BackgroundListener(logging.handlers.QueueListener):
+        """Queue listener with a bounded shutdown so a stalled disk cannot hang worker exit"""
+
+        def enqueue_sentinel(self):
+            self.queue.put(self._sentinel, timeout=Config.LOG_SHUTDOWN_TIMEOUT)
+
+        def stop(self):
+            if self._thread:
+                try:
+                    self.enqueue_sentinel()
+                except queue.Full:
+                    pass
+                else:
+                    self._thread.join(Config.LOG_SHUTDOWN_TIMEOUT)
+                self._thread = None
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                    handler.close()
+                except Exception:
+                    pass
 
     class MemoryHandler(logging.Handler):
         def emit(self, record):
@@ -55,13 +188,13 @@ class Logger:
                 'message': record.getMessage(),
                 'module': record.name,
                 'function': record.funcName,
-                'line': record.lineno
+                'line': record.lineno,
+                'worker': record.process
             }
-            Logger._logs.append(log_entry)
-
-            # Keep only last 1000 logs in memory
-            if len(Logger._logs) > 1000:
-                Logger._logs = Logger._logs[-1000:]
+            try:
+                Logger._buffer.append(log_entry)
+            except Exception:
+                self.handleError(record)
 
     @classmethod
     def get_logger(cls):
@@ -72,12 +205,50 @@ class Logger:
 
     @classmethod
     def get_logs(cls, limit=100, level=None):
-        """Get logs from memory"""
-        logs = cls._logs
+        """Get the most recent logs from all workers"""
+        logs, _, _ = cls.read_logs(limit=limit, level=level)
+        return logs
+
+    @classmethod
+    def read_logs(cls, since=0, limit=100, level=None):
+        """Read logs after a sequence cursor
 
-        # Filter by level if specified
-        if level:
-            logs = [log for log in logs if log['level'] == level.upper()]
+        Returns (logs, cursor, info) where cursor is the seq to pass as `since`
+        on the next call. info reports entries lost to ring wrap-around or a
+        buffer reset so pollers know their view is incomplete.
+        """
+        if cls._buffer is None:
+            cls()
+        return read_since(cls._buffer, since=since, limit=limit, level=level)
+
+    @classmethod
+    def get_queue_stats(cls):
+        """Get background log queue statistics"""
+        if cls._queue is None:
+            return {}
+        return {
+            'queued': cls._queue.qsize(),
+            'capacity': cls._queue.maxsize,
+            'overflow_policy': cls._queue_handler.overflow,
+            'dropped': cls._queue_handler.dropped
+        }
+
+    @classmethod
+    def get_buffer_stats(cls):
+        """Get size statistics for the log buffer behind /logs"""
+        if cls._buffer is None:
+            return {}
+        return cls._buffer.stats()
+
+    @classmethod
+    def shutdown(cls):
+        """Flush queued records and stop the background listener"""
+        listener = cls._listener
+        if listener is None:
+            return
+        cls._listener = None
+        if cls._logger is not None and cls._queue_handler is not None:
+            cls._logger.removeHandler(cls._queue_handler)
+        listener.stop()
 
-        # Return last 'limit' logs
-        return logs[-limit:]
+atexit.register(Logger.shutdown)
@@ -4,6 +4,7 @@ import os
 import sys
 from config import Config
 from logger_config import Logger
+from utils import model_lifecycle
 
 def create_app():
     """Application factory pattern with auto-reload"""
@@ -29,6 +30,9 @@ def create_app():
     # Auto-register API blueprints
     register_api_routes(app, logger)
 
+    # Load and warm up models now that routes are registered
+    model_lifecycle.start_all(Config.MODEL_LOAD_MODE)
+
     return app
 
 def register_api_routes(app, logger):
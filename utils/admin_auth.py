@@ -0,0 +1,28 @@
+import hmac
+from functools import wraps
+from flask import jsonify, request
+from config import Config
+
+
+def require_admin_token(view):
+    """Protect a debug/admin endpoint with the shared ADMIN_TOKEN
+
+    The token is accepted as `X-Admin-Token` or `Authorization: Bearer <token>`.
+    Admin endpoints are disabled entirely (404) while ADMIN_TOKEN is unset.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.ADMIN_TOKEN:
+            return jsonify({"status_code": 404, "error": "Admin endpoints are disabled"}), 404
+
+        token = request.headers.get('X-Admin-Token', '')
+        auth_header = request.headers.get('Authorization', '')
+        if not token and auth_header.startswith('Bearer '):
+            token = auth_header[len('Bearer '):]
+
+        if not hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode()):
+            return jsonify({"status_code": 401, "error": "Invalid or missing admin token"}), 401
+
+        return view(*args, **kwargs)
+
+    return wrapper
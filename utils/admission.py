@@ -0,0 +1,434 @@
+"""Admission control and backpressure for expensive endpoints.
+
+Each request's cost is estimated in seconds from its payload size and
+candidate count. The estimate is scaled by a correction factor learned from
+observed latencies. A request is admitted only if the time it has already
+spent queued, plus the work in flight in this worker, plus its own cost fits
+the latency budget. Requests that would overrun are turned away immediately
+with 503 and Retry-After. They are not accepted only to be killed by the
+gunicorn timeout after doing partial work. Requests that could never fit the
+budget get 413. An optional per-client token bucket (cost-seconds per
+second) gives each client a fair share and answers 429 when a client
+exceeds it. The buckets live in a shared-memory table (HostClientBuckets)
+so the rate applies to the whole host, not to each worker separately.
+
+Queue time before the worker picked the request up is taken from an
+`X-Request-Start` header set by the proxy, when present. Sync workers only
+ever have one request in flight, so without the header a worker cannot see
+the burst queued in the listen backlog. Workers therefore also publish their
+in-flight cost to a small shared-memory table (HostLoad). When the header
+is missing, the expected backlog wait is estimated from the other workers'
+in-flight work.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+_registry = {}
+
+
+class Rejection:
+    """Why a request was not admitted, rendered as an HTTP error by the caller"""
+
+    def __init__(self, status_code, error, retry_after, estimated_seconds):
+        self.status_code = status_code
+        self.error = error
+        self.retry_after = retry_after
+        self.estimated_seconds = estimated_seconds
+
+
+class Ticket:
+    """Admitted work; release it when the request finishes so the cost model learns
+
+    Only work the cost model describes should be timed: call start_clock()
+    once waiting on other things (e.g. a cold model) is over, and set
+    learn = False for outcomes that say nothing about request cost.
+    """
+
+    def __init__(self, controller, estimated_seconds, raw_estimate):
+        self.controller = controller
+        self.estimated_seconds = estimated_seconds
+        self.raw_estimate = raw_estimate
+        self.started = time.perf_counter()
+        self.learn = True
+        self._released = False
+
+    def start_clock(self):
+        self.started = time.perf_counter()
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self.controller._release(self, time.perf_counter() - self.started)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.learn = False
+        self.release()
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, amount):
+        """Take `amount` tokens; returns 0 on success, else seconds until they would be available"""
+        now = time.monotonic()
+        self.tokens, wait = self.settle(self.tokens, now - self.updated, self.rate, self.burst, amount)
+        self.updated = now
+        return wait
+
+    @staticmethod
+    def settle(tokens, elapsed, rate, burst, amount):
+        """Refill for `elapsed` seconds and take `amount`; returns (tokens left, seconds to wait)"""
+        tokens = min(burst, tokens + elapsed * rate)
+        # A single request bigger than the burst is allowed once the bucket is full
+        amount = min(amount, burst)
+        if tokens >= amount:
+            return tokens - amount, 0.0
+        return tokens, (amount - tokens) / rate
+
+
+def queued_seconds(header_value, now=None):
+    """Seconds since the proxy received the request, from `X-Request-Start`
+
+    Accepts nginx style `t=<seconds.millis>` as well as bare seconds,
+    milliseconds or microseconds since the epoch.
+    """
+    if not header_value:
+        return 0.0
+    try:
+        value = float(header_value.strip().lstrip('t='))
+    except ValueError:
+        return 0.0
+    if value > 1e14:
+        value /= 1e6
+    elif value > 1e11:
+        value /= 1e3
+    now = time.time() if now is None else now
+    return max(0.0, now - value)
+
+
+class HostLoad:
+    """In-flight cost of every worker on the host, one slot per worker in a mapped file
+
+    Each worker writes only its own slot, so updates take no lock; the file
+    lock is only held while a worker claims a slot. Slots of dead workers
+    are ignored by readers and reclaimed by the next worker to start.
+    """
+
+    SLOT = struct.Struct('<qdq')  # pid, in-flight seconds, in-flight requests
+    SLOTS = 256
+
+    def __init__(self, path):
+        if fcntl is None:
+            raise OSError("HostLoad requires fcntl (POSIX)")
+        self.path = path
+        self.size = self.SLOT.size * self.SLOTS
+        self._slot_pid = None
+        self._offset = None
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            if size == 0:
+                os.ftruncate(fd, self.size)
+            elif size != self.size:
+                raise OSError(f"{path} has an unexpected size ({size} bytes)")
+            self._map = mmap.mmap(fd, self.size)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+        except Exception:
+            os.close(fd)
+            raise
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True
+        return True
+
+    def _claim(self):
+        """Find (or take over) this process's slot; re-run after a fork"""
+        pid = os.getpid()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            free = None
+            for index in range(self.SLOTS):
+                slot_pid = self.SLOT.unpack_from(self._map, index * self.SLOT.size)[0]
+                if slot_pid == pid:
+                    free = index
+                    break
+                if free is None and (slot_pid == 0 or not self._alive(slot_pid)):
+                    free = index
+            if free is None:
+                raise OSError("No free HostLoad slot")
+            self._offset = free * self.SLOT.size
+            self.SLOT.pack_into(self._map, self._offset, pid, 0.0, 0)
+            self._slot_pid = pid
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def publish(self, in_flight_seconds, in_flight):
+        if self._slot_pid != os.getpid():
+            self._claim()
+        self.SLOT.pack_into(self._map, self._offset, self._slot_pid, in_flight_seconds, in_flight)
+
+    def snapshot(self):
+        """(workers, in-flight seconds, in-flight requests) summed over the other live workers"""
+        if self._slot_pid != os.getpid():
+            self._claim()
+        workers, seconds, requests = 1, 0.0, 0
+        for index in range(self.SLOTS):
+            pid, slot_seconds, slot_requests = self.SLOT.unpack_from(self._map, index * self.SLOT.size)
+            if pid == 0 or pid == self._slot_pid or not self._alive(pid):
+                continue
+            workers += 1
+            seconds += max(0.0, slot_seconds)
+            requests += max(0, slot_requests)
+        return workers, seconds, requests
+
+    def expected_wait(self):
+        """Seconds a request arriving now would likely wait in the backlog
+
+        Only meaningful while every worker is busy: then the next free
+        worker is, on average, the in-flight work divided across workers.
+        """
+        workers, seconds, requests = self.snapshot()
+        if requests < workers - 1:
+            return 0.0
+        return seconds / workers
+
+
+class HostClientBuckets:
+    """Per-client token buckets shared by every worker on the host, in a mapped hash table
+
+    Clients are keyed by a 64-bit hash of their id and placed by linear
+    probing; when a probe window is full the least recently used bucket in
+    it is reused for the new client. Updates are read-modify-write, so they
+    hold the file lock. time.monotonic() is system-wide on Linux, so bucket
+    timestamps are comparable across workers.
+    """
+
+    SLOT = struct.Struct('<Qdd')  # client key (0 = empty), tokens, updated (monotonic)
+    PROBES = 16
+
+    def __init__(self, path, slots=4096):
+        if fcntl is None:
+            raise OSError("HostClientBuckets requires fcntl (POSIX)")
+        self.path = path
+        self.slots = slots
+        self.size = self.SLOT.size * slots
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            if size == 0:
+                os.ftruncate(fd, self.size)
+            elif size != self.size:
+                raise OSError(f"{path} has an unexpected size ({size} bytes)")
+            self._map = mmap.mmap(fd, self.size)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+        except Exception:
+            os.close(fd)
+            raise
+
+    @staticmethod
+    def _key(client_id):
+        digest = hashlib.blake2b(str(client_id).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') | 1
+
+    def take(self, client_id, amount, rate, burst):
+        """Take `amount` tokens from the client's bucket; returns 0 on success, else seconds to wait"""
+        key = self._key(client_id)
+        now = time.monotonic()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            offset = None
+            oldest = None
+            for probe in range(self.PROBES):
+                slot_offset = ((key + probe) % self.slots) * self.SLOT.size
+                slot_key, tokens, updated = self.SLOT.unpack_from(self._map, slot_offset)
+                if slot_key == key:
+                    offset = slot_offset
+                    break
+                if slot_key == 0:
+                    offset, tokens, updated = slot_offset, burst, now
+                    break
+                if oldest is None or updated < oldest[1]:
+                    oldest = (slot_offset, updated)
+            else:
+                offset, tokens, updated = oldest[0], burst, now
+
+            tokens, wait = TokenBucket.settle(tokens, max(0.0, now - updated), rate, burst, amount)
+            self.SLOT.pack_into(self._map, offset, key, tokens, now)
+            return wait
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def tracked(self):
+        return sum(1 for index in range(self.slots) if self.SLOT.unpack_from(self._map, index * self.SLOT.size)[0])
+
+
+class AdmissionController:
+    def __init__(self, budget_seconds, base_seconds, seconds_per_item, seconds_per_kb,
+                 max_defer_seconds=0.0, client_rate=0.0, client_burst=0.0, max_clients=10000, host_load=None,
+                 client_buckets=None):
+        self.budget_seconds = budget_seconds
+        self.base_seconds = base_seconds
+        self.seconds_per_item = seconds_per_item
+        self.seconds_per_kb = seconds_per_kb
+        self.max_defer_seconds = max_defer_seconds
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.host_load = host_load
+        self.client_buckets = client_buckets
+
+        self.correction = 1.0
+        self.in_flight_seconds = 0.0
+        self.in_flight = 0
+        self.counters = {
+            "admitted": 0, "rejected_overload": 0, "rejected_too_large": 0, "rejected_client": 0,
+            "queue_time_from_header": 0, "queue_time_estimated": 0
+        }
+        self._clients = OrderedDict()
+        self._condition = threading.Condition()
+
+    def raw_estimate(self, payload_bytes, items):
+        """Static cost model in seconds, before the learned correction"""
+        return self.base_seconds + self.seconds_per_item * items + self.seconds_per_kb * payload_bytes / 1024.0
+
+    def estimate(self, payload_bytes, items):
+        return self.raw_estimate(payload_bytes, items) * self.correction
+
+    def admit(self, payload_bytes, items, client_id=None, queued=0.0):
+        """Return a Ticket if the request fits the latency budget, otherwise a Rejection"""
+        raw = self.raw_estimate(payload_bytes, items)
+        estimated = raw * self.correction
+        # 413 is permanent for the client, so decide it from the static model,
+        # not from a correction that may be inflated by temporary host state
+        if raw > self.budget_seconds:
+            with self._condition:
+                self.counters["rejected_too_large"] += 1
+            return Rejection(413, "Request is too large to process within the latency budget", None, estimated)
+
+        if client_id is not None and self.client_rate > 0:
+            wait = self._take_client_tokens(client_id, estimated)
+            if wait:
+                with self._condition:
+                    self.counters["rejected_client"] += 1
+                return Rejection(429, "Client request rate exceeded", max(1, math.ceil(wait)), estimated)
+
+        # Without the proxy's timestamp, estimate the backlog wait from the rest of the host
+        estimate_queue = not queued and self.host_load is not None
+
+        with self._condition:
+            self.counters["queue_time_estimated" if estimate_queue else "queue_time_from_header"] += 1
+            started = time.monotonic()
+            while True:
+                waited = time.monotonic() - started
+                if estimate_queue:
+                    queued = self._host_wait()
+                remaining = self.budget_seconds - queued - waited
+                if self.in_flight_seconds + estimated <= remaining:
+                    break
+                if waited >= self.max_defer_seconds:
+                    self.counters["rejected_overload"] += 1
+                    retry_after = max(1, math.ceil(self.in_flight_seconds + estimated - remaining))
+                    return Rejection(503, "Server is overloaded, retry later", retry_after, estimated)
+                # Defer briefly: in-flight work here or on other workers may finish and free budget
+                self._condition.wait(min(0.05, self.max_defer_seconds - waited))
+
+            self.in_flight_seconds += estimated
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+            self._publish()
+        return Ticket(self, estimated, raw)
+
+    def _host_wait(self):
+        try:
+            return self.host_load.expected_wait()
+        except OSError:
+            return 0.0
+
+    def _publish(self):
+        if self.host_load is not None:
+            try:
+                self.host_load.publish(self.in_flight_seconds, self.in_flight)
+            except OSError:
+                pass
+
+    def _take_client_tokens(self, client_id, amount):
+        if self.client_buckets is not None:
+            try:
+                return self.client_buckets.take(client_id, amount, self.client_rate, self.client_burst)
+            except OSError:
+                pass
+        # Per-worker buckets: only used without the shared table, where a client gets the rate in each worker
+        with self._condition:
+            bucket = self._clients.get(client_id)
+            if bucket is None:
+                bucket = TokenBucket(self.client_rate, self.client_burst)
+                self._clients[client_id] = bucket
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(client_id)
+            return bucket.take(amount)
+
+    def _release(self, ticket, elapsed):
+        with self._condition:
+            self.in_flight_seconds = max(0.0, self.in_flight_seconds - ticket.estimated_seconds)
+            self.in_flight -= 1
+            self._publish()
+            # Learn how far off the static cost model is on this host (EWMA, clamped)
+            if ticket.learn and ticket.raw_estimate > 0:
+                observed = min(10.0, max(0.1, elapsed / ticket.raw_estimate))
+                self.correction = min(10.0, max(0.1, 0.9 * self.correction + 0.1 * observed))
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return dict(
+                self.counters,
+                in_flight=self.in_flight,
+                in_flight_seconds=round(self.in_flight_seconds, 4),
+                cost_correction=round(self.correction, 4),
+                budget_seconds=self.budget_seconds,
+                tracked_clients=self.client_buckets.tracked() if self.client_buckets else len(self._clients),
+                host_load=self.host_load is not None,
+                host_client_buckets=self.client_buckets is not None
+            )
+
+
+def register(name, controller):
+    """Register a controller so the status endpoint can report on it"""
+    _registry[name] = controller
+    return controller
+
+
+def all_stats():
+    return {name: controller.stats() for name, controller in _registry.items()}
@@ -0,0 +1,99 @@
+import numpy as np
+
+EMBEDDING_DTYPES = ('float32', 'float16', 'int8')
+
+
+class CompactEmbeddings:
+    """Row-normalised embedding matrix stored as float32, float16 or int8.
+
+    Rows are L2-normalised before storage, so cosine similarity is a plain dot
+    product. int8 rows carry a per-row scale (max |x| / 127). Only the
+    compact form is kept: similarity widens the query side to float32 per
+    call and runs a float32 (BLAS) product against the stored matrix, with
+    int8 scales applied to the result. int8 dot products of normalised
+    384-dim rows stay below 2**24, so float32 accumulates them exactly.
+    """
+
+    def __init__(self, values, scales, dtype):
+        self.values = values
+        self.scales = scales
+        self.dtype = dtype
+
+    @classmethod
+    def from_float(cls, matrix, dtype='float32'):
+        """Normalise and quantise a (rows x dim) float matrix"""
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.maximum(norms, 1e-12)
+
+        if dtype == 'float32':
+            return cls(matrix, None, dtype)
+        if dtype == 'float16':
+            return cls(matrix.astype(np.float16), None, dtype)
+
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        values = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return cls(values, scales, dtype)
+
+    @classmethod
+    def stack(cls, rows, dtype):
+        """Combine single-row embeddings (e.g. cache hits) into one matrix"""
+        values = np.concatenate([row.values for row in rows])
+        scales = np.concatenate([row.scales for row in rows]) if dtype == 'int8' else None
+        return cls(values, scales, dtype)
+
+    def row(self, i):
+        """Single-row view; copy() it before keeping it beyond the batch's lifetime"""
+        scales = self.scales[i:i + 1] if self.scales is not None else None
+        return CompactEmbeddings(self.values[i:i + 1], scales, self.dtype)
+
+    def copy(self):
+        """Detached copy, so a kept row does not pin the whole batch it was sliced from"""
+        scales = self.scales.copy() if self.scales is not None else None
+        return CompactEmbeddings(self.values.copy(), scales, self.dtype)
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def similarity(self, other):
+        """Cosine similarity matrix (len(self) x len(other)); both sides must share a dtype
+
+        `other` (the placeholder matrix) is used as stored; numpy promotes it
+        to float32 for the product only, so no widened copy outlives the call.
+        """
+        dots = self.to_float() @ other.values.T
+        if other.dtype == 'int8':
+            dots *= other.scales[None, :]
+        return dots
+
+    def to_float(self):
+        if self.dtype == 'int8':
+            return self.values.astype(np.float32) * self.scales[:, None]
+        return self.values.astype(np.float32)
+
+
+def score_drift(queries, references, dtype):
+    """Measure max-score drift of `dtype` against float32 for the given float embeddings
+
+    Returns the worst absolute difference over all (query, reference) pairs and
+    over the per-query max score, which is what the detector actually uses.
+    """
+    exact = CompactEmbeddings.from_float(queries).similarity(CompactEmbeddings.from_float(references))
+    compact = CompactEmbeddings.from_float(queries, dtype).similarity(
+        CompactEmbeddings.from_float(references, dtype)
+    )
+    return {
+        "dtype": dtype,
+        "max_pair_drift": float(np.abs(exact - compact).max()),
+        "max_score_drift": float(np.abs(exact.max(axis=1) - compact.max(axis=1)).max())
+    }
@@ -0,0 +1,347 @@
+"""CPU-topology-aware worker and thread planning.
+
+Gunicorn workers each run their own torch runtime, and torch defaults to one
+intra-op thread per visible core. On large hosts that oversubscribes the CPUs
+several times over. The planner reads the CPU set this process may run on and
+any cgroup quota. It then picks a worker count and per-worker torch thread
+counts so that workers * threads matches the CPUs actually available, and it
+can optionally pin each worker to its own disjoint set of cores.
+
+Environment overrides:
+    WEB_WORKERS              number of gunicorn workers
+    TORCH_INTRA_OP_THREADS   torch intra-op threads per worker
+    TORCH_INTER_OP_THREADS   torch inter-op threads per worker
+    PIN_WORKERS_TO_CPUS      'true' to pin each worker to disjoint cores
+
+This module is imported by gunicorn_config.py in the master process, so it
+must not touch logger_config (whose listener thread would not survive fork).
+
+Benchmark mode sweeps configurations on this host:
+    python -m utils.cpu_planner --benchmark
+"""
+import math
+import os
+
+_plan = None
+_worker_plan = None
+
+
+def available_cpus():
+    """CPU ids this process is allowed to run on"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def cgroup_cpu_limit():
+    """CPU quota from cgroup v2 or v1 as a (possibly fractional) core count, or None"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def _usable_cpus(cpus, quota):
+    """Whole cores we can keep busy: the CPU set, capped by the cgroup quota"""
+    if quota is None:
+        return len(cpus)
+    return min(len(cpus), max(1, math.floor(quota)))
+
+
+def _env_int(name):
+    """Positive integer override from the environment, or None when unset"""
+    value = os.getenv(name, '').strip()
+    if not value:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ValueError(f"{name} must be an integer of at least 1, got {value!r}")
+    return number
+
+
+class WorkerPlan:
+    """Worker count, per-worker thread counts and optional CPU sets"""
+
+    def __init__(self, cpus, quota, workers, intra_op_threads, inter_op_threads, pin):
+        self.cpus = cpus
+        self.quota = quota
+        self.workers = workers
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.pin = pin
+        self.cpu_sets = self._split_cpus() if pin else None
+
+    @property
+    def usable_cpus(self):
+        return _usable_cpus(self.cpus, self.quota)
+
+    def _split_cpus(self):
+        """Disjoint CPU sets per worker slot; None if there are not enough cores to pin"""
+        if self.workers * self.intra_op_threads > len(self.cpus):
+            return None
+        size = self.intra_op_threads
+        return [self.cpus[i * size:(i + 1) * size] for i in range(self.workers)]
+
+    def cpus_for_slot(self, slot):
+        if not self.cpu_sets:
+            return None
+        return self.cpu_sets[slot % len(self.cpu_sets)]
+
+    def to_dict(self):
+        return {
+            "available_cpus": len(self.cpus),
+            "cgroup_quota": self.quota,
+            "usable_cpus": self.usable_cpus,
+            "workers": self.workers,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "pinned": bool(self.cpu_sets)
+        }
+
+
+def plan(refresh=False):
+    """Build (and cache) the worker plan for this host"""
+    global _plan
+    if _plan is not None and not refresh:
+        return _plan
+
+    cpus = available_cpus()
+    quota = cgroup_cpu_limit()
+    usable = _usable_cpus(cpus, quota)
+
+    intra = _env_int('TORCH_INTRA_OP_THREADS')
+    workers = _env_int('WEB_WORKERS')
+    if intra is None:
+        if workers:
+            intra = max(1, usable // workers)
+        else:
+            # Small encoder batches scale poorly past a couple of threads;
+            # extra cores are better spent on more workers.
+            intra = 2 if usable >= 4 else 1
+    if workers is None:
+        workers = max(1, usable // intra)
+
+    inter = _env_int('TORCH_INTER_OP_THREADS') or 1
+    pin = os.getenv('PIN_WORKERS_TO_CPUS', 'False').lower() == 'true'
+
+    _plan = WorkerPlan(cpus, quota, workers, intra, inter, pin)
+    return _plan
+
+
+def assign_slot(server, worker):
+    """gunicorn pre_fork hook: give the new worker the first CPU slot not held by a live worker"""
+    worker_plan = plan()
+    taken = {getattr(w, 'cpu_slot', None) for w in server.WORKERS.values()}
+    free = [slot for slot in range(worker_plan.workers) if slot not in taken]
+    worker.cpu_slot = free[0] if free else worker.age % worker_plan.workers
+
+
+def apply_to_worker(server, worker):
+    """gunicorn post_fork hook: limit thread pools and pin the worker before torch is imported"""
+    global _worker_plan
+    worker_plan = plan()
+    _worker_plan = worker_plan
+
+    threads = str(worker_plan.intra_op_threads)
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[name] = threads
+    # The fast tokenizer's own thread pool would otherwise use every core
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+
+    slot = getattr(worker, 'cpu_slot', 0)
+    cpus = worker_plan.cpus_for_slot(slot)
+    if cpus:
+        try:
+            os.sched_setaffinity(0, cpus)
+        except (AttributeError, OSError) as e:
+            server.log.warning(f"Could not pin worker {worker.pid} to CPUs {cpus}: {str(e)}")
+            cpus = None
+
+    server.log.info(
+        f"Worker {worker.pid} slot {slot}: intra_op={worker_plan.intra_op_threads} "
+        f"inter_op={worker_plan.inter_op_threads} cpus={cpus or 'unpinned'}"
+    )
+
+
+def configure_torch():
+    """Import torch and apply the planned thread counts; call before the model is built
+
+    Outside gunicorn (no post_fork hook ran) only explicit environment
+    overrides are applied, so the dev server keeps torch's defaults.
+    """
+    import torch
+
+    if _worker_plan is not None:
+        intra = _worker_plan.intra_op_threads
+        inter = _worker_plan.inter_op_threads
+    else:
+        intra = _env_int('TORCH_INTRA_OP_THREADS')
+        inter = _env_int('TORCH_INTER_OP_THREADS')
+
+    if intra:
+        torch.set_num_threads(intra)
+    if inter:
+        try:
+            torch.set_num_interop_threads(inter)
+        except RuntimeError:
+            # Inter-op pool already started; it can only be sized once per process
+            pass
+
+    return {"intra_op_threads": torch.get_num_threads(), "inter_op_threads": torch.get_num_interop_threads()}
+
+
+def current_worker_plan():
+    """Plan applied to this worker, or None when not running under the gunicorn hooks"""
+    return _worker_plan
+
+
+# ---------------------------------------------------------------------------
+# Benchmark mode
+# ---------------------------------------------------------------------------
+
+def _benchmark_worker(cpus, intra, inter, payload, requests, barrier, results):
+    """Run in a child process: load the detector with fixed threads and time requests"""
+    import time
+
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    os.environ['TORCH_INTRA_OP_THREADS'] = str(intra)
+    os.environ['TORCH_INTER_OP_THREADS'] = str(inter)
+    configure_torch()
+
+    from api.company_name_detector import _load_detector
+    detector = _load_detector()
+    detector.detect_placeholder(payload)
+
+    barrier.wait()
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        detector.detect_placeholder(payload)
+        latencies.append(time.perf_counter() - started)
+    results.put((time.time(), latencies))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty sequence"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _benchmark_config(workers, intra, inter, pin, payload, requests):
+    import multiprocessing
+    import time
+
+    ctx = multiprocessing.get_context('spawn')
+    worker_plan = WorkerPlan(available_cpus(), cgroup_cpu_limit(), workers, intra, inter, pin)
+    barrier = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(
+            target=_benchmark_worker,
+            args=(worker_plan.cpus_for_slot(slot), intra, inter, payload, requests, barrier, results)
+        )
+        for slot in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    barrier.wait()
+    started = time.time()
+
+    finished_at, latencies = [], []
+    for _ in procs:
+        end, worker_latencies = results.get()
+        finished_at.append(end)
+        latencies.extend(worker_latencies)
+    for proc in procs:
+        proc.join()
+
+    wall = max(finished_at) - started
+    return {
+        "workers": workers,
+        "intra_op_threads": intra,
+        "inter_op_threads": inter,
+        "throughput_rps": round(len(latencies) / wall, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+def benchmark(requests=50, items=40, inter=1, pin=False, latency_slack=1.5):
+    """Sweep (workers, intra-op threads) pairs that fill the usable CPUs
+
+    The recommendation is the highest-throughput configuration whose p95 is
+    within `latency_slack` times the best p95 observed.
+    """
+    usable = plan().usable_cpus
+    texts = ["Acme Studio", "Company", "Brand Title Here", "Welcome to our store.", "Grand Opening", "Cafe Name"]
+    payload = [{"text": texts[i % len(texts)], "index": i} for i in range(items)]
+
+    thread_counts = sorted({1, 2, 4, 8, usable} & set(range(1, usable + 1)))
+    configs = []
+    for intra in thread_counts:
+        configs.append((max(1, usable // intra), intra))
+
+    results = []
+    for workers, intra in configs:
+        result = _benchmark_config(workers, intra, inter, pin, payload, requests)
+        print(
+            f"workers={workers:<3} intra_op={intra:<3} "
+            f"throughput={result['throughput_rps']:>8} rps  "
+            f"p50={result['p50_ms']:>8}ms  p95={result['p95_ms']:>8}ms  p99={result['p99_ms']:>8}ms"
+        )
+        results.append(result)
+
+    best_p95 = min(r["p95_ms"] for r in results)
+    eligible = [r for r in results if r["p95_ms"] <= best_p95 * latency_slack]
+    best = max(eligible, key=lambda r: r["throughput_rps"])
+    return results, best
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Plan gunicorn workers and torch threads for this host")
+    parser.add_argument('--benchmark', action='store_true', help='sweep configurations and recommend one')
+    parser.add_argument('--requests', type=int, default=50, help='requests per worker per configuration')
+    parser.add_argument('--items', type=int, default=40, help='text_json items per benchmark request')
+    parser.add_argument('--pin', action='store_true', help='pin benchmark workers to disjoint cores')
+    parser.add_argument('--latency-slack', type=float, default=1.5,
+                        help='accept configs whose p95 is within this factor of the best p95')
+    args = parser.parse_args(argv)
+
+    print(json.dumps(plan().to_dict(), indent=2))
+    if not args.benchmark:
+        return
+
+    _, best = benchmark(args.requests, args.items, pin=args.pin, latency_slack=args.latency_slack)
+    print("\nRecommended:")
+    print(f"WEB_WORKERS={best['workers']}")
+    print(f"TORCH_INTRA_OP_THREADS={best['intra_op_threads']}")
+    print(f"TORCH_INTER_OP_THREADS={best['inter_op_threads']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""Accuracy-versus-latency regression gate for detector configurations.
+
+Runs the labelled corpus (utils/detector_eval_corpus.json) through a
+reference detector (float32 embeddings, no cache, default weights) and any
+number of candidate configurations. For each one it reports precision/recall
+against the labels, agreement with the reference on the detected index and
+confidence bucket, and per-document latency.
+
+    python -m utils.detector_eval --candidate int8:embedding_dtype=int8
+    python -m utils.detector_eval --candidate fp16:embedding_dtype=float16 --check
+    python -m utils.detector_eval --candidate pool:PARALLEL_PRESCORE_PROCESSES=4,PARALLEL_PRESCORE_MIN_ITEMS=1
+
+Upper-case keys override Config settings (e.g. the PARALLEL_PRESCORE_*
+options) while that candidate runs, so Config-driven paths can be gated
+too. The embedding cache is cleared before every pass, so with cache_size
+set each pass measures the same cache behaviour rather than repeats being
+served from the previous pass.
+
+With --check the process exits non-zero when a candidate falls below the
+agreement floor, loses precision/recall versus the reference, or (if set)
+exceeds the latency ratio, so it can run before a rollout.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from config import Config
+from utils.cpu_planner import percentile
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'detector_eval_corpus.json')
+
+# Options passed to AdvancedPlaceholderDetector(...); everything else goes to detect_placeholder(...)
+DETECTOR_OPTIONS = ('embedding_dtype', 'cache_size')
+
+REFERENCE_CONFIG = {"embedding_dtype": "float32", "cache_size": 0}
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path) as f:
+        return json.load(f)["documents"]
+
+
+def parse_config(spec):
+    """Parse 'name:key=value,key=value' into (name, options); values are JSON where possible"""
+    name, _, options = spec.partition(':')
+    config = {}
+    for pair in filter(None, options.split(',')):
+        key, _, value = pair.partition('=')
+        try:
+            config[key.strip()] = json.loads(value)
+        except ValueError:
+            config[key.strip()] = value.strip()
+    return name, config
+
+
+def config_settings(config):
+    """The upper-case keys of a config, which override Config settings; unknown names are rejected"""
+    settings = {key: value for key, value in config.items() if key.isupper()}
+    unknown = [key for key in settings if not hasattr(Config, key)]
+    if unknown:
+        raise ValueError(f"Unknown Config setting(s): {', '.join(unknown)}")
+    return settings
+
+
+@contextlib.contextmanager
+def config_overrides(settings):
+    """Apply Config settings for the duration of one configuration's run"""
+    from utils import parallel_prescore
+
+    previous = {key: getattr(Config, key) for key in settings}
+    for key, value in settings.items():
+        setattr(Config, key, value)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            setattr(Config, key, value)
+        # The prescoring pool is sized when it starts; the next configuration gets its own
+        parallel_prescore.shutdown()
+
+
+def build_detector(model, config):
+    from api.company_name_detector import AdvancedPlaceholderDetector
+
+    config = {key: value for key, value in config.items() if not key.isupper()}
+    options = {key: value for key, value in config.items() if key in DETECTOR_OPTIONS}
+    detect_kwargs = {key: value for key, value in config.items() if key not in DETECTOR_OPTIONS}
+    return AdvancedPlaceholderDetector(model, **options), detect_kwargs
+
+
+def run_config(detector, detect_kwargs, corpus, repeat=1):
+    """Detect every document `repeat` times; returns per-document decisions and latencies"""
+    from api.company_name_detector import WARMUP_TEXT_JSON
+
+    detector.detect_placeholder(WARMUP_TEXT_JSON, **detect_kwargs)
+
+    decisions = {}
+    latencies = []
+    for _ in range(repeat):
+        detector.clear_embedding_cache()
+        for doc in corpus:
+            started = time.perf_counter()
+            result = detector.detect_placeholder(doc["text_json"], **detect_kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            data = result["data"] if result else None
+            decisions[doc["id"]] = {
+                "index": data["index"] if data else None,
+                "confidence": data["confidence"] if data else None,
+                "method": data["detection_method"] if data else None
+            }
+    return decisions, latencies
+
+
+def score(corpus, decisions, latencies, reference=None):
+    """Precision/recall against labels, agreement with the reference and latency summary"""
+    true_positive = false_positive = positives = 0
+    for doc in corpus:
+        expected = doc["expected_index"]
+        predicted = decisions[doc["id"]]["index"]
+        if expected is not None:
+            positives += 1
+        if predicted is not None:
+            if predicted == expected:
+                true_positive += 1
+            else:
+                false_positive += 1
+
+    predicted_count = true_positive + false_positive
+    report = {
+        "precision": round(true_positive / predicted_count, 4) if predicted_count else 1.0,
+        "recall": round(true_positive / positives, 4) if positives else 1.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "mean": round(sum(latencies) / len(latencies), 3)
+        }
+    }
+
+    if reference is not None:
+        same_index = same_decision = 0
+        disagreements = []
+        for doc in corpus:
+            ours, theirs = decisions[doc["id"]], reference[doc["id"]]
+            if ours["index"] == theirs["index"]:
+                same_index += 1
+                if ours["confidence"] == theirs["confidence"]:
+                    same_decision += 1
+                    continue
+            disagreements.append({"id": doc["id"], "candidate": ours, "reference": theirs})
+        report["index_agreement"] = round(same_index / len(corpus), 4)
+        report["decision_agreement"] = round(same_decision / len(corpus), 4)
+        report["disagreements"] = disagreements
+
+    return report
+
+
+def gate(report, reference_report, min_agreement, max_latency_ratio=None):
+    """Return the list of reasons a candidate fails the rollout gate (empty means pass)"""
+    failures = []
+    if report["decision_agreement"] < min_agreement:
+        failures.append(f"decision agreement {report['decision_agreement']} < {min_agreement}")
+    if report["precision"] < reference_report["precision"]:
+        failures.append(f"precision {report['precision']} < reference {reference_report['precision']}")
+    if report["recall"] < reference_report["recall"]:
+        failures.append(f"recall {report['recall']} < reference {reference_report['recall']}")
+    if max_latency_ratio is not None:
+        ratio = report["latency_ms"]["p95"] / max(reference_report["latency_ms"]["p95"], 1e-9)
+        if ratio > max_latency_ratio:
+            failures.append(f"p95 latency ratio {round(ratio, 3)} > {max_latency_ratio}")
+    return failures
+
+
+def evaluate(candidates, corpus=None, repeat=1, model=None):
+    """Evaluate named candidate configs against the reference; returns {name: report}"""
+    from api.company_name_detector import load_model
+
+    corpus = corpus or load_corpus()
+    model = model or load_model()
+
+    detector, kwargs = build_detector(model, REFERENCE_CONFIG)
+    reference_decisions, reference_latencies = run_config(detector, kwargs, corpus, repeat)
+    reports = {"reference": score(corpus, reference_decisions, reference_latencies)}
+    reports["reference"]["config"] = REFERENCE_CONFIG
+
+    for name, config in candidates:
+        with config_overrides(config_settings(config)):
+            detector, kwargs = build_detector(model, dict(REFERENCE_CONFIG, **config))
+            decisions, latencies = run_config(detector, kwargs, corpus, repeat)
+        reports[name] = score(corpus, decisions, latencies, reference_decisions)
+        reports[name]["config"] = config
+
+    return reports
+
+
+def print_table(reports):
+    print(f"{'config':<16}{'precision':>10}{'recall':>8}{'agree':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, report in reports.items():
+        agreement = report.get("decision_agreement", 1.0)
+        print(
+            f"{name:<16}{report['precision']:>10}{report['recall']:>8}{agreement:>8}"
+            f"{report['latency_ms']['p50']:>10}{report['latency_ms']['p95']:>10}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare detector configurations against the reference pipeline")
+    parser.add_argument('--candidate', action='append', default=[],
+                        help="name:key=value,... e.g. int8:embedding_dtype=int8,threshold=0.75; "
+                             "upper-case keys override Config settings")
+    parser.add_argument('--corpus', default=CORPUS_PATH)
+    parser.add_argument('--repeat', type=int, default=3, help='passes over the corpus per configuration')
+    parser.add_argument('--check', action='store_true', help='exit 1 if any candidate fails the gate')
+    parser.add_argument('--min-agreement', type=float, default=1.0,
+                        help='minimum decision agreement with the reference (index and confidence)')
+    parser.add_argument('--max-latency-ratio', type=float, default=None,
+                        help='maximum candidate/reference p95 latency ratio')
+    parser.add_argument('--json', action='store_true', help='print the full report as JSON')
+    args = parser.parse_args(argv)
+
+    candidates = [parse_config(spec) for spec in args.candidate]
+    for _, config in candidates:
+        try:
+            config_settings(config)
+        except ValueError as e:
+            parser.error(str(e))
+    reports = evaluate(candidates, load_corpus(args.corpus), args.repeat)
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print_table(reports)
+
+    if not args.check:
+        return 0
+
+    failed = False
+    for name, _ in candidates:
+        failures = gate(reports[name], reports["reference"], args.min_agreement, args.max_latency_ratio)
+        status = "FAIL" if failures else "PASS"
+        print(f"{status} {name}" + (": " + "; ".join(failures) if failures else ""))
+        for disagreement in reports[name]["disagreements"]:
+            print(f"    {disagreement['id']}: candidate={disagreement['candidate']} reference={disagreement['reference']}")
+        failed = failed or bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Model-free lexical stages of the placeholder detector.
+
+The pattern tables and LexicalPlaceholderScorer have no dependency on the
+encoder, Flask or the logger, so prescoring pool processes (see
+utils/parallel_prescore.py) can import them without pulling in the API
+blueprint, its logger listener or its shared-memory tables.
+"""
+import re
+from difflib import SequenceMatcher
+
+# Enhanced placeholder patterns
+PLACEHOLDER_PATTERNS = [
+    "YOUR COMPANY", "YOUR BRAND", "COMPANY NAME", "INDUSTRY NAME", "SOCCER CLUB", "BRAND NAME", "SCHOOL NAME", "SALON NAME","THE CHURCH NAME","Catering Service",
+    "CHURCH NAME", "COLLEGE NAME", "ENTERPRISE NAME", "BOOK STORE", "SHOP NAME","HVAC SERVICE","CAFE NAME",
+    "STORE FOUNDATION", "ANY ASSOCIATION", "ORGANISER NAME", "FARM NAME",
+    "FOOD STALL", "PUBLICATION NAME", "WRITE COMPANY NAME", "UNIVERSITY NAME",
+    "ORGANIZATION NAME", "FIRM NAME", "AGENCY NAME", "STUDIO NAME", "CLINIC NAME",
+    "HOSPITAL NAME", "RESTAURANT NAME", "HOTEL NAME", "BANK NAME", "INSURANCE NAME","CLEANING SERVICE",
+    "COMPANY TITLE", "BRAND TITLE", "ORGANIZATION TITLE", "CLUB NAME", "YOUR CLUB NAME","CLEANING CLASSES", "CLEANING CLASS",
+    "BUSINESS NAME", "CORPORATION NAME", "ENTERPRISE TITLE", "ESTABLISHMENT NAME",
+    "INSTITUTION NAME", "VENUE NAME", "SERVICE NAME", "CENTER NAME", "GROUP NAME",
+    "ASSOCIATION NAME", "FOUNDATION NAME", "SOCIETY NAME", "UNION NAME", "LEAGUE NAME",
+    "COOPERATIVE NAME", "PARTNERSHIP NAME", "LLC NAME", "INC NAME", "CORP NAME",
+    "INSERT COMPANY NAME", "ADD COMPANY NAME", "ENTER COMPANY NAME",
+    "COMPANY NAME HERE", "YOUR BUSINESS NAME", "BUSINESS NAME HERE",
+    "ORGANIZATION NAME HERE", "BRAND NAME HERE", "NAME OF COMPANY",
+    "NAME OF ORGANIZATION", "NAME OF BUSINESS", "COMPANY/ORGANIZATION NAME"
+]
+
+# Regex patterns
+REGEX_PATTERNS = [
+    r'\[.*?(?:company|business|organization|brand|name).*?\]',
+    r'\{.*?(?:company|business|organization|brand|name).*?\}',
+    r'\(.*?(?:company|business|organization|brand|name).*?\)',
+    r'<.*?(?:company|business|organization|brand|name).*?>',
+    r'___+\s*(?:company|business|organization|brand|name).*?___+',
+    r'\.\.\.+\s*(?:company|business|organization|brand|name)',
+    r'(?:company|business|organization|brand|name)\s*\.\.\.+',
+    r'_+(?:company|business|organization|brand|name)_+',
+    r'\*+(?:company|business|organization|brand|name)\*+',
+]
+
+class LexicalPlaceholderScorer:
+    """Model-free stages of the detector (standalone check, exact/regex, fuzzy, format)"""
+
+    def __init__(self):
+        self.placeholder_patterns = PLACEHOLDER_PATTERNS
+        self.regex_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in REGEX_PATTERNS]
+        
+        self.normalized_placeholders = [self.normalize_text(p) for p in self.placeholder_patterns]
+        
+        self.sentence_indicators = [
+            'the', 'a', 'an', 'this', 'that', 'these', 'those', 'our', 'their', 'his', 'her',
+            'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
+            'will', 'would', 'could', 'should', 'must', 'can', 'may', 'might',
+            'in', 'on', 'at', 'by', 'for', 'with', 'to', 'from', 'of', 'about'
+        ]
+
+    def normalize_text(self, text):
+        if not text:
+            return ""
+        normalized = re.sub(r'\s+', ' ', text.strip().lower())
+        normalized = re.sub(r'[^\w\s\[\](){}><_.*-]', '', normalized)
+        return normalized
+
+    def is_standalone_text(self, text, context_texts=None):
+        normalized = self.normalize_text(text)
+        words = normalized.split()
+        
+        if len(words) > 6:
+            return False
+        
+        for word in words:
+            if word in self.sentence_indicators:
+                return False
+        
+        sentence_patterns = [
+            r'\b(?:the|a|an)\s+\w+',
+            r'\w+\s+(?:is|are|was|were|will|would)\s+',
+            r'\w+\s+(?:has|have|had)\s+',
+            r'(?:in|on|at|by|for|with|to|from)\s+\w+',
+        ]
+        
+        for pattern in sentence_patterns:
+            if re.search(pattern, normalized):
+                return False
+        
+        if text.strip().endswith(('.', '!', '?', ';')):
+            return False
+        
+        verb_patterns = [
+            r'\b(?:provide|offer|deliver|create|make|build|develop|design|sell|buy)\b',
+            r'\b(?:specializes?|focuses?|operates?|manages?|handles?)\b'
+        ]
+        
+        for pattern in verb_patterns:
+            if re.search(pattern, normalized):
+                return False
+        
+        return True
+
+    def exact_pattern_match(self, text):
+        normalized = self.normalize_text(text)
+        
+        for pattern in self.normalized_placeholders:
+            if normalized == pattern:
+                return True, 1.0
+        
+        for regex_pattern in self.regex_patterns:
+            if regex_pattern.search(text):
+                return True, 0.95
+        
+        return False, 0.0
+
+    def format_analysis(self, text):
+        score = 0.0
+        
+        if text.isupper():
+            score += 0.3
+        
+        if re.search(r'[\[\](){}><]', text):
+            score += 0.4
+        
+        if re.search(r'[_.]{2,}', text):
+            score += 0.3
+        
+        placeholder_words = ['company', 'business', 'organization', 'brand', 'name', 'your', 'insert', 'add', 'enter', 'classes', 'salon', 'service']
+        text_lower = text.lower()
+        for word in placeholder_words:
+            if word in text_lower:
+                score += 0.2
+                break
+        
+        return min(score, 1.0)
+
+    def fuzzy_matching(self, text):
+        normalized = self.normalize_text(text)
+        
+        if not normalized:
+            return 0.0
+        
+        scores = []
+        
+        for pattern in self.normalized_placeholders:
+            scores.append(SequenceMatcher(None, normalized, pattern).ratio())
+        
+        text_words = set(normalized.split())
+        for pattern in self.normalized_placeholders:
+            pattern_words = set(pattern.split())
+            if text_words and pattern_words:
+                jaccard = len(text_words.intersection(pattern_words)) / len(text_words.union(pattern_words))
+                scores.append(jaccard)
+        
+        return max(scores) if scores else 0.0
+
+    def prescore(self, items):
+        """Run the lexical stages over (position, text, index) items in order
+
+        Stops at the first exact match, like the full pipeline. Returns the
+        exact match (or None) and the standalone candidates that still need
+        semantic scoring, each as (position, text, index, fuzzy, format).
+        """
+        candidates = []
+        
+        for position, text, index in items:
+            if not text:
+                continue
+            
+            if not self.is_standalone_text(text):
+                continue
+            
+            is_exact_match, exact_score = self.exact_pattern_match(text)
+            if is_exact_match:
+                return {"exact": (position, text, index, exact_score), "candidates": candidates}
+            
+            candidates.append((position, text, index, self.fuzzy_matching(text), self.format_analysis(text)))
+        
+        return {"exact": None, "candidates": candidates}
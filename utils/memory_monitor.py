@@ -0,0 +1,264 @@
+"""Memory accounting for live workers.
+
+Each worker runs a sampler thread that records RSS, the number of live
+Python allocator blocks (a count, not bytes; byte figures come from
+tracemalloc while tracing is on) and registered component probes (e.g. the
+embedding cache) every MEMORY_SAMPLE_INTERVAL seconds into a bounded
+history. The history is also written to the shared profile directory so any
+worker can report on all of its siblings.
+
+Allocation tracing (tracemalloc) is off by default. When it is on, requests
+record their peak allocation per stage (see utils/request_trace.py) and the
+admin endpoint can snapshot the top allocation sites, optionally as growth
+since the previous snapshot. Tracing can be toggled at runtime per worker.
+
+With WORKER_MAX_RSS_MB set, a worker whose RSS crosses the limit is asked
+to exit gracefully after its current request and gunicorn replaces it.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from config import Config
+from logger_config import Logger
+from utils.sampling_profiler import write_json
+
+logger = Logger.get_logger()
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+_probes = {}
+_history = deque(maxlen=Config.MEMORY_HISTORY_SIZE)
+_requests = deque(maxlen=Config.MEMORY_REQUEST_HISTORY)
+_lock = threading.Lock()
+_sampler_pid = None
+_recycle = None
+_recycle_requested = False
+_last_snapshot = None
+
+
+def _memory_dir():
+    return os.path.join(Config.PROFILE_DIR, 'memory')
+
+
+def rss_bytes():
+    """Current resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def register_probe(name, probe):
+    """Register a callable returning a dict of byte counts for one component"""
+    _probes[name] = probe
+
+
+def _run_probes():
+    results = {}
+    for name, probe in list(_probes.items()):
+        try:
+            results[name] = probe()
+        except Exception as e:
+            results[name] = {"error": str(e)}
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available():
+        results["torch_cuda"] = {
+            "allocated_bytes": torch.cuda.memory_allocated(),
+            "reserved_bytes": torch.cuda.memory_reserved()
+        }
+    return results
+
+
+def sample():
+    """Take one memory sample of this worker"""
+    record = {
+        "timestamp": time.time(),
+        "rss_bytes": rss_bytes(),
+        "python_allocated_blocks": sys.getallocatedblocks(),
+        "probes": _run_probes()
+    }
+    if tracemalloc.is_tracing():
+        record["traced_bytes"], record["traced_peak_bytes"] = tracemalloc.get_traced_memory()
+    return record
+
+
+def _check_limit(record):
+    global _recycle_requested
+    limit = Config.WORKER_MAX_RSS_MB * 1024 * 1024
+    if not limit or _recycle is None or _recycle_requested or not record["rss_bytes"]:
+        return
+    if record["rss_bytes"] > limit:
+        _recycle_requested = True
+        logger.warning(
+            f"Worker {os.getpid()} RSS {record['rss_bytes'] // (1024 * 1024)}MB exceeds "
+            f"WORKER_MAX_RSS_MB={Config.WORKER_MAX_RSS_MB}, recycling after current request"
+        )
+        _recycle()
+
+
+def _record():
+    record = sample()
+    with _lock:
+        _history.append(record)
+        history = list(_history)
+    _check_limit(record)
+    try:
+        os.makedirs(_memory_dir(), exist_ok=True)
+        write_json(os.path.join(_memory_dir(), f"{os.getpid()}.json"), {
+            "worker": os.getpid(),
+            "parent": os.getppid(),
+            "tracing": tracemalloc.is_tracing(),
+            "history": history
+        })
+    except OSError:
+        pass
+
+
+def _run():
+    while True:
+        try:
+            _record()
+        except Exception as e:
+            logger.error(f"Memory sampling failed: {str(e)}")
+        time.sleep(Config.MEMORY_SAMPLE_INTERVAL)
+
+
+def start():
+    """Start this worker's sampler thread (once per process); enables tracing if configured"""
+    global _sampler_pid
+    with _lock:
+        if _sampler_pid == os.getpid() or Config.MEMORY_SAMPLE_INTERVAL <= 0:
+            return
+        _sampler_pid = os.getpid()
+    if Config.MEMORY_TRACING:
+        set_tracing(True)
+    threading.Thread(target=_run, name='memory-sampler', daemon=True).start()
+
+
+def enable_recycling(callback):
+    """Call `callback` once when RSS exceeds WORKER_MAX_RSS_MB (set from the gunicorn post_fork hook)"""
+    global _recycle
+    _recycle = callback
+
+
+def set_tracing(enabled, frames=None):
+    """Start or stop tracemalloc in this worker; returns whether tracing is on"""
+    global _last_snapshot
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(frames or Config.MEMORY_TRACE_FRAMES)
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+        _last_snapshot = None
+    return tracemalloc.is_tracing()
+
+
+def is_tracing():
+    return tracemalloc.is_tracing()
+
+
+def tracing_status():
+    return {
+        "worker": os.getpid(),
+        "tracing": tracemalloc.is_tracing(),
+        "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else None
+    }
+
+
+def record_request(trace, rss_before):
+    """Keep a finished request's memory record in the bounded per-worker history"""
+    rss_after = rss_bytes()
+    record = trace.to_dict()
+    record.update(
+        timestamp=time.time(),
+        rss_bytes=rss_after,
+        rss_delta_bytes=rss_after - rss_before if rss_after is not None and rss_before is not None else None
+    )
+    with _lock:
+        _requests.append(record)
+
+
+def top_allocations(limit=25, group_by='lineno', compare=False):
+    """Top allocation sites from a tracemalloc snapshot; None if tracing is off
+
+    With compare=True the sites are ranked by growth since the previous
+    snapshot taken by this worker, which is what points at a leak.
+    """
+    global _last_snapshot
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    previous, _last_snapshot = _last_snapshot, snapshot
+
+    if compare and previous is not None:
+        stats = snapshot.compare_to(previous, group_by)
+        sites = [{
+            "site": _site(stat.traceback),
+            "size_bytes": stat.size,
+            "size_diff_bytes": stat.size_diff,
+            "count": stat.count,
+            "count_diff": stat.count_diff
+        } for stat in stats[:limit]]
+    else:
+        stats = snapshot.statistics(group_by)
+        sites = [{"site": _site(stat.traceback), "size_bytes": stat.size, "count": stat.count} for stat in stats[:limit]]
+
+    return {
+        "compared": compare and previous is not None,
+        "traced_bytes": tracemalloc.get_traced_memory()[0],
+        "sites": sites
+    }
+
+
+def _site(traceback):
+    return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+
+def worker_report():
+    """This worker's history, recent request records and current sample"""
+    with _lock:
+        history = list(_history)
+        requests = list(_requests)
+    return {
+        "worker": os.getpid(),
+        "tracing": tracemalloc.is_tracing(),
+        "max_rss_mb": Config.WORKER_MAX_RSS_MB,
+        "recycle_requested": _recycle_requested,
+        "current": sample(),
+        "history": history,
+        "requests": requests
+    }
+
+
+def all_workers():
+    """Latest written history of every live worker sharing our parent"""
+    try:
+        entries = os.listdir(_memory_dir())
+    except OSError:
+        return []
+
+    workers = []
+    for entry in entries:
+        if not entry.endswith('.json') or not entry[:-5].isdigit():
+            continue
+        path = os.path.join(_memory_dir(), entry)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            os.kill(data["worker"], 0)
+        except (OSError, ValueError, KeyError):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        if data.get("parent") == os.getppid():
+            workers.append(data)
+    return sorted(workers, key=lambda data: data["worker"])
@@ -0,0 +1,149 @@
+import threading
+import time
+from config import Config
+from logger_config import Logger
+
+logger = Logger.get_logger()
+
+COLD = 'cold'
+LOADING = 'loading'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+_registry = {}
+
+
+class ModelLifecycle:
+    """Deferred loading and warm-up of a heavy model.
+
+    Nothing is loaded at import time. `start()` runs the loader (in a
+    background thread by default) followed by an optional warm-up callable,
+    recording how long each took so readiness probes can report it.
+
+    A failed load is retried after MODEL_RETRY_BACKOFF seconds, doubling on
+    each consecutive failure up to MODEL_RETRY_BACKOFF_MAX, so a transient
+    error (a download, a full disk, a busy GPU) does not leave the worker
+    unready until it is restarted.
+    """
+
+    def __init__(self, name, loader, warmup=None):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.state = COLD
+        self.error = None
+        self.load_seconds = None
+        self.warmup_ms = None
+        self.ready_at = None
+        self.failures = 0
+        self.retry_at = None
+        self.extra = {}
+        self._instance = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self, background=True):
+        """Begin loading unless a load is already underway or finished"""
+        with self._lock:
+            retry_due = self.state == FAILED and time.time() >= self.retry_at
+            if self.state != COLD and not retry_due:
+                return
+            self.state = LOADING
+            self._done.clear()
+
+        if background:
+            thread = threading.Thread(target=self._run, name=f'{self.name}-loader', daemon=True)
+            thread.start()
+        else:
+            self._run()
+
+    def _run(self):
+        try:
+            started = time.perf_counter()
+            instance = self.loader()
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            logger.info(f"{self.name} loaded in {self.load_seconds}s")
+
+            if self.warmup:
+                self.state = WARMING
+                started = time.perf_counter()
+                self.extra.update(self.warmup(instance) or {})
+                self.warmup_ms = round((time.perf_counter() - started) * 1000, 2)
+                logger.info(f"{self.name} warmed up in {self.warmup_ms}ms")
+
+            self._instance = instance
+            self.ready_at = time.time()
+            self.failures = 0
+            self.retry_at = None
+            self.error = None
+            self.state = READY
+        except Exception as e:
+            self.failures += 1
+            backoff = min(Config.MODEL_RETRY_BACKOFF * 2 ** (self.failures - 1), Config.MODEL_RETRY_BACKOFF_MAX)
+            self.error = str(e)
+            self.retry_at = time.time() + backoff
+            self.state = FAILED
+            logger.error(f"Failed to load {self.name} (attempt {self.failures}, retrying in {backoff:g}s): {str(e)}")
+            retry = threading.Timer(backoff, self.start)
+            retry.daemon = True
+            retry.start()
+        finally:
+            self._done.set()
+
+    def get(self, timeout=None):
+        """Return the loaded instance, starting a load if needed
+
+        Waits up to `timeout` seconds for an in-flight load; returns None if the
+        model is still not ready by then, or at once if it failed and is
+        waiting out its retry backoff.
+        """
+        if self.state == READY:
+            return self._instance
+        self.start(background=True)
+        self._done.wait(timeout)
+        return self._instance if self.state == READY else None
+
+    @property
+    def is_ready(self):
+        return self.state == READY
+
+    def status(self):
+        status = {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "warmup_ms": self.warmup_ms,
+            "ready_since": self.ready_at
+        }
+        if self.error:
+            status["error"] = self.error
+        if self.state == FAILED:
+            status["failures"] = self.failures
+            status["retry_in_seconds"] = round(max(0.0, self.retry_at - time.time()), 1)
+        status.update(self.extra)
+        return status
+
+
+def register(lifecycle):
+    """Register a lifecycle so startup hooks and readiness probes can see it"""
+    _registry[lifecycle.name] = lifecycle
+    return lifecycle
+
+
+def start_all(mode='background'):
+    """Kick off model loading for every registered lifecycle
+
+    mode: 'background' loads in a thread, 'eager' blocks until loaded,
+    'lazy' defers loading to the first request that needs the model.
+    """
+    if mode == 'lazy':
+        return
+    for lifecycle in _registry.values():
+        lifecycle.start(background=(mode != 'eager'))
+
+
+def readiness():
+    """Return (ready, per-model status) across all registered lifecycles"""
+    models = {name: lifecycle.status() for name, lifecycle in _registry.items()}
+    ready = all(lifecycle.is_ready for lifecycle in _registry.values())
+    return ready, models
@@ -0,0 +1,171 @@
+"""Intra-request parallelism for the lexical stages of very large documents.
+
+The standalone, exact/regex, fuzzy and format checks are pure Python and
+hold the GIL, so on one huge `text_json` they run on a single core. With
+PARALLEL_PRESCORE_PROCESSES > 0 a document with at least
+PARALLEL_PRESCORE_MIN_ITEMS elements is split into contiguous chunks and
+scored by a persistent process pool owned by the worker. Only the surviving
+candidates come back; they are merged in original order and the earliest
+exact match wins, so the result is the same as the sequential pass.
+
+Each chunk is submitted as its own task. Once the answer is known (an exact
+match, or a timeout) the request's stop flag in shared memory is raised, so
+queued chunks return at once and running ones stop within a few elements
+instead of occupying the pool for the next request. A timeout raises
+PrescoreTimeout, which the endpoint answers with a fast 503; rerunning the
+document sequentially would only take longer. Any other pool failure falls
+back to the sequential pass in the caller.
+
+The pool is created on first use in each worker with the spawn start method
+(the worker holds threads and the model, which must not be forked). Pool
+processes import only this module and the scorer's (see
+utils/lexical_scorer.py), so nothing here may start the logger or touch
+Flask at import time; the logger is fetched only on the worker side.
+"""
+import atexit
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from config import Config
+from logger_config import Logger
+
+# Stop flags shared with the pool, one per in-flight request (slots are reused round robin)
+STOP_SLOTS = 64
+# Elements scored between checks of the stop flag
+STOP_CHECK_EVERY = 32
+
+_pool = None
+_pool_pid = None
+_stop_flags = None
+_pool_lock = threading.Lock()
+_request_ids = itertools.count()
+
+# Scorer instance and stop flags inside each pool process, set once by the initializer
+_scorer = None
+
+
+class PrescoreTimeout(Exception):
+    """The pool did not score a document within PARALLEL_PRESCORE_TIMEOUT"""
+
+
+def _init_process(factory, stop_flags):
+    global _scorer, _stop_flags
+    _scorer = factory()
+    _stop_flags = stop_flags
+
+
+def _until_stopped(slot, chunk):
+    for position, item in enumerate(chunk):
+        if position % STOP_CHECK_EVERY == 0 and _stop_flags[slot]:
+            return
+        yield item
+
+
+def _run_chunk(slot, chunk):
+    # A stopped request's result is discarded, so whatever was scored so far is fine to return
+    return _scorer.prescore(_until_stopped(slot, chunk))
+
+
+def should_parallelize(item_count):
+    return Config.PARALLEL_PRESCORE_PROCESSES > 0 and item_count >= Config.PARALLEL_PRESCORE_MIN_ITEMS
+
+
+def _get_pool(factory):
+    global _pool, _pool_pid, _stop_flags
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            context = multiprocessing.get_context('spawn')
+            _stop_flags = context.Array('b', STOP_SLOTS, lock=False)
+            _pool = context.Pool(
+                Config.PARALLEL_PRESCORE_PROCESSES, initializer=_init_process, initargs=(factory, _stop_flags)
+            )
+            _pool_pid = os.getpid()
+        return _pool, _stop_flags
+
+
+def _chunks(items, processes):
+    # A few chunks per process keeps the pool busy when the cost per element is uneven
+    size = max(Config.PARALLEL_PRESCORE_MIN_CHUNK, -(-len(items) // (processes * 4)))
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def merge(results):
+    """Combine per-chunk prescores, in chunk order, into one for the whole document
+
+    Stops at the first chunk with an exact match; candidates before it are
+    kept, as in the sequential pass. `results` may be a lazy iterator, so
+    later chunks are never waited on once the answer is known.
+    """
+    candidates = []
+    for result in results:
+        candidates.extend(result["candidates"])
+        if result["exact"]:
+            return {"exact": result["exact"], "candidates": candidates}
+    return {"exact": None, "candidates": candidates}
+
+
+def _ordered_results(pending, timeout):
+    deadline = time.monotonic() + timeout
+    for result in pending:
+        try:
+            yield result.get(max(0.0, deadline - time.monotonic()))
+        except multiprocessing.TimeoutError:
+            raise PrescoreTimeout(f"prescoring did not finish within {timeout}s") from None
+
+
+def prescore(factory, items):
+    """Prescore items in the pool; returns None if the pool is unavailable so the caller runs sequentially
+
+    `factory` builds the scorer in each pool process and must be importable
+    (a module-level class or function) from a module that is cheap to import
+    and free of Flask and the logger, e.g. utils.lexical_scorer. Raises PrescoreTimeout if the pool
+    does not finish within PARALLEL_PRESCORE_TIMEOUT.
+    """
+    slot = next(_request_ids) % STOP_SLOTS
+    stop_flags = None
+    try:
+        pool, stop_flags = _get_pool(factory)
+        stop_flags[slot] = 0
+        pending = [pool.apply_async(_run_chunk, (slot, chunk))
+                   for chunk in _chunks(items, Config.PARALLEL_PRESCORE_PROCESSES)]
+        return merge(_ordered_results(pending, Config.PARALLEL_PRESCORE_TIMEOUT))
+    except PrescoreTimeout:
+        Logger.get_logger().warning(f"Parallel prescoring of {len(items)} items timed out, cancelling outstanding chunks")
+        raise
+    except Exception as e:
+        Logger.get_logger().warning(
+            f"Parallel prescoring failed, falling back to sequential: {type(e).__name__}: {str(e)}"
+        )
+        shutdown()
+        return None
+    finally:
+        # Whatever is still queued or running for this request is no longer wanted
+        if stop_flags is not None:
+            stop_flags[slot] = 1
+
+
+def stats():
+    with _pool_lock:
+        return {
+            "processes": Config.PARALLEL_PRESCORE_PROCESSES,
+            "min_items": Config.PARALLEL_PRESCORE_MIN_ITEMS,
+            "pool_started": _pool is not None and _pool_pid == os.getpid()
+        }
+
+
+def shutdown():
+    """Terminate this worker's pool (it is recreated on next use)"""
+    global _pool, _pool_pid, _stop_flags
+    with _pool_lock:
+        pool, owner = _pool, _pool_pid
+        _pool = None
+        _pool_pid = None
+        _stop_flags = None
+    if pool is not None and owner == os.getpid():
+        pool.terminate()
+        pool.join()
+
+
+atexit.register(shutdown)
@@ -0,0 +1,182 @@
+"""Request/response codecs for bulk endpoints.
+
+Request bodies may be compressed (`Content-Encoding: gzip` or `zstd`) and
+encoded as JSON or MessagePack (`Content-Type: application/msgpack`).
+The body is read from the request stream with a cap of
+MAX_DECOMPRESSED_BYTES, and a larger declared Content-Length is refused
+before anything is read. Decompression is streamed with the same cap on its
+output, so a small compressed body cannot expand without limit inside a
+worker.
+
+Responses follow the client's `Accept` (JSON unless MessagePack is
+preferred) and `Accept-Encoding` (zstd, then gzip, for bodies large enough
+to be worth compressing).
+"""
+import gzip
+import json
+import zlib
+from flask import Response, request
+from config import Config
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+READ_CHUNK = 64 * 1024
+
+JSON_TYPES = ('application/json',)
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+
+class PayloadError(Exception):
+    """Request body could not be decoded; carries the HTTP status to answer with"""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _inflate_gzip(data, limit):
+    """Inflate every gzip member in the body (concatenated members are valid gzip)"""
+    output = bytearray()
+    while True:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            output += decompressor.decompress(data, limit + 1 - len(output))
+        except zlib.error as e:
+            raise PayloadError(400, f"Invalid gzip body: {str(e)}")
+        if len(output) > limit or decompressor.unconsumed_tail:
+            raise PayloadError(413, f"Decompressed body exceeds {limit} bytes")
+        if not decompressor.eof:
+            raise PayloadError(400, "Invalid gzip body: stream is truncated")
+        data = decompressor.unused_data
+        if not data:
+            return bytes(output)
+
+
+def _inflate_zstd(data, limit):
+    """Inflate every zstd frame in the body
+
+    The bounded reader enforces the size cap but treats a truncated frame as
+    a clean end, so once the output is known to fit, the frames are decoded
+    again one by one to check that each is complete.
+    """
+    if zstandard is None:
+        raise PayloadError(415, "zstd request bodies are not supported on this server")
+    decompressor = zstandard.ZstdDecompressor()
+    try:
+        with decompressor.stream_reader(data, read_across_frames=True) as reader:
+            size = 0
+            while size <= limit:
+                chunk = reader.read(limit + 1 - size)
+                if not chunk:
+                    break
+                size += len(chunk)
+        if size > limit:
+            raise PayloadError(413, f"Decompressed body exceeds {limit} bytes")
+
+        output = bytearray()
+        while data:
+            frame = decompressor.decompressobj()
+            output += frame.decompress(data)
+            if not frame.eof:
+                raise PayloadError(400, "Invalid zstd body: stream is truncated")
+            data = frame.unused_data
+    except zstandard.ZstdError as e:
+        raise PayloadError(400, f"Invalid zstd body: {str(e)}")
+    return bytes(output)
+
+
+def _read_body(limit):
+    """Read the wire body, never buffering more than `limit` + 1 bytes of it"""
+    if request.content_length is not None and request.content_length > limit:
+        raise PayloadError(413, f"Body exceeds {limit} bytes")
+    chunks = []
+    size = 0
+    while size <= limit:
+        chunk = request.stream.read(min(READ_CHUNK, limit + 1 - size))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    if size > limit:
+        raise PayloadError(413, f"Body exceeds {limit} bytes")
+    return b''.join(chunks)
+
+
+def decode_request():
+    """Decode the current request body; returns (content, decoded_size_in_bytes)"""
+    limit = Config.MAX_DECOMPRESSED_BYTES
+    encoding = (request.headers.get('Content-Encoding') or 'identity').strip().lower()
+    if encoding not in ('gzip', 'x-gzip', 'zstd', 'identity'):
+        raise PayloadError(415, f"Unsupported Content-Encoding: {encoding}")
+
+    # A compressed body is never usefully larger than its decompressed output
+    data = _read_body(limit)
+    if encoding in ('gzip', 'x-gzip'):
+        data = _inflate_gzip(data, limit)
+    elif encoding == 'zstd':
+        data = _inflate_zstd(data, limit)
+
+    if not data:
+        return None, 0
+
+    mimetype = request.mimetype or 'application/json'
+    if mimetype in MSGPACK_TYPES:
+        if msgpack is None:
+            raise PayloadError(415, "MessagePack request bodies are not supported on this server")
+        try:
+            return msgpack.unpackb(data, raw=False), len(data)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as e:
+            raise PayloadError(400, f"Invalid MessagePack body: {str(e)}")
+
+    if mimetype in JSON_TYPES or mimetype.endswith('+json'):
+        try:
+            return json.loads(data), len(data)
+        except ValueError as e:
+            raise PayloadError(400, f"Invalid JSON body: {str(e)}")
+
+    raise PayloadError(415, f"Unsupported Content-Type: {mimetype}")
+
+
+def _response_mimetype():
+    offered = ['application/json']
+    if msgpack is not None:
+        offered.append('application/msgpack')
+    best = request.accept_mimetypes.best_match(offered, default='application/json')
+    return best or 'application/json'
+
+
+def _response_encoding(size):
+    if size < Config.RESPONSE_COMPRESS_MIN_BYTES:
+        return None
+    offered = ['zstd', 'gzip'] if zstandard is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def respond(payload, status=200, headers=None):
+    """Serialise payload in the negotiated format and encoding"""
+    mimetype = _response_mimetype()
+    if mimetype == 'application/msgpack':
+        body = msgpack.packb(payload, use_bin_type=True)
+    else:
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+    response_headers = {'Vary': 'Accept, Accept-Encoding'}
+    encoding = _response_encoding(len(body))
+    if encoding == 'zstd':
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+        response_headers['Content-Encoding'] = 'zstd'
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=5)
+        response_headers['Content-Encoding'] = 'gzip'
+
+    response_headers.update(headers or {})
+    return Response(body, status=status, mimetype=mimetype, headers=response_headers)
@@ -0,0 +1,88 @@
+"""Per-request stage attribution.
+
+A request opens a trace with `begin()`; code on the request path wraps its
+phases in `stage(name)` and may attach facts with `annotate()`. The trace is
+thread-local, so detector code needs no request object and stays usable
+outside Flask (warm-up, the eval harness).
+
+Every stage records its duration. With memory tracing on (tracemalloc), it
+also records the peak Python allocation above its starting point. Stages
+are flat: the peak counter is process-wide, so a stage must not be opened
+inside another. While no trace is open, `stage()` returns a shared no-op
+context manager and `annotate()` does nothing.
+"""
+import contextlib
+import threading
+import time
+import tracemalloc
+
+_local = threading.local()
+_noop = contextlib.nullcontext()
+
+
+class RequestTrace:
+    def __init__(self, name, trace_memory=False):
+        self.name = name
+        self.trace_memory = trace_memory and tracemalloc.is_tracing()
+        self.stages = []
+        self.attributes = {}
+        self.started = time.perf_counter()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        record = {"stage": name}
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record["peak_alloc_bytes"] = peak - start
+                record["retained_bytes"] = current - start
+            self.stages.append(record)
+
+    @property
+    def peak_alloc_bytes(self):
+        peaks = [record["peak_alloc_bytes"] for record in self.stages if "peak_alloc_bytes" in record]
+        return max(peaks) if peaks else None
+
+    def to_dict(self):
+        return dict(self.attributes, request=self.name, stages=self.stages, peak_alloc_bytes=self.peak_alloc_bytes)
+
+
+def begin(name, trace_memory=False):
+    """Open a trace for the current thread's request, replacing any left open"""
+    trace = RequestTrace(name, trace_memory)
+    _local.trace = trace
+    return trace
+
+
+def end():
+    """Close and return the current thread's trace (None if none was open)"""
+    trace = getattr(_local, 'trace', None)
+    _local.trace = None
+    return trace
+
+
+def current():
+    return getattr(_local, 'trace', None)
+
+
+def stage(name):
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return _noop
+    return trace.stage(name)
+
+
+def annotate(**attributes):
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.attributes.update(attributes)
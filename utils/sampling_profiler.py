@@ -0,0 +1,328 @@
+"""Low-overhead sampling profiler for live workers.
+
+A profile is a background thread that periodically snapshots every other
+thread's Python stack (sys._current_frames) and counts collapsed stacks.
+Output is in the collapsed "frame;frame;frame count" format understood by
+flamegraph.pl, speedscope and similar tools.
+
+Nothing runs while no profile is active: the only standing cost is a signal
+handler and a small registration file per worker. To profile every worker
+on the host, the requesting worker writes the session description to the
+shared profile directory and sends SIGPROF to its registered siblings, which
+start their own sampler and write results next to each other. Only the
+newest PROFILE_KEEP_SESSIONS session directories are kept.
+"""
+import atexit
+import json
+import os
+import shutil
+import signal
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from config import Config
+from logger_config import Logger
+
+logger = Logger.get_logger()
+
+PROFILE_SIGNAL = getattr(signal, 'SIGPROF', None)
+
+_active = None
+_active_lock = threading.Lock()
+_registered_pid = None
+
+
+def _workers_dir():
+    return os.path.join(Config.PROFILE_DIR, 'workers')
+
+
+def _session_dir(profile_id):
+    return os.path.join(Config.PROFILE_DIR, profile_id)
+
+
+def write_json(path, data):
+    """Write atomically so concurrent readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame, thread_name):
+    """Root-first ';'-joined stack for one thread"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(f"thread:{thread_name}")
+    labels.reverse()
+    return ';'.join(labels)
+
+
+class SamplingProfiler:
+    """Samples all other threads of this process every `interval` seconds for `seconds`"""
+
+    def __init__(self, profile_id, seconds, interval):
+        self.profile_id = profile_id
+        self.seconds = seconds
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self.started_at = None
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        global _active
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + self.seconds
+        try:
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    self.counts[collapse_stack(frame, names.get(thread_id, thread_id))] += 1
+                self.samples += 1
+                time.sleep(self.interval)
+            self._save()
+        except Exception as e:
+            logger.error(f"Profiler {self.profile_id} failed: {str(e)}")
+        finally:
+            with _active_lock:
+                _active = None
+
+    def _save(self):
+        session_dir = _session_dir(self.profile_id)
+        os.makedirs(session_dir, exist_ok=True)
+        write_json(os.path.join(session_dir, f"{os.getpid()}.json"), {
+            "worker": os.getpid(),
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "samples": self.samples,
+            "stacks": dict(self.counts)
+        })
+
+
+def start_local(profile_id, seconds, interval, blocking=True):
+    """Start a profile in this worker; returns False if one is already running
+
+    The signal handler passes blocking=False so it can never deadlock on a
+    lock held by the code it interrupted.
+    """
+    global _active
+    if not _active_lock.acquire(blocking=blocking):
+        return False
+    try:
+        if _active is not None:
+            return False
+        _active = SamplingProfiler(profile_id, seconds, interval)
+        _active.start()
+    finally:
+        _active_lock.release()
+    return True
+
+
+def _handle_signal(signum, frame):
+    """SIGPROF handler: join the session described by the shared request file"""
+    try:
+        session = _read_json(os.path.join(Config.PROFILE_DIR, 'current.json'))
+        if session['expires_at'] > time.time():
+            start_local(session['profile_id'], session['seconds'], session['interval'], blocking=False)
+    except Exception:
+        pass
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def _proc_identity(pid):
+    """(parent pid, start time in clock ticks) from /proc/<pid>/stat, or None if unreadable"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the ')' of the comm name start at field 3 (state);
+            # ppid is field 4 and starttime field 22
+            fields = f.read().rsplit(')', 1)[1].split()
+        return int(fields[1]), int(fields[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _is_registered_sibling(pid, registration):
+    """True only if pid is verifiably the sibling worker that wrote `registration`
+
+    The registration holds the worker's start time, so a file left behind by
+    a worker killed without running atexit does not match a new process that
+    reused its pid (SIGPROF's default action would kill it). Without a
+    readable /proc nothing can be verified, so nothing is signalled.
+    """
+    identity = _proc_identity(pid)
+    return identity is not None and identity == (os.getppid(), registration)
+
+
+def sibling_workers():
+    """Registered workers sharing our parent, excluding ourselves"""
+    try:
+        entries = os.listdir(_workers_dir())
+    except OSError:
+        return []
+
+    siblings = []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        if pid == os.getpid():
+            continue
+        path = os.path.join(_workers_dir(), entry)
+        try:
+            with open(path) as f:
+                registration = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            registration = None
+        identity = _proc_identity(pid)
+        if not _is_alive(pid) or (identity is not None and identity[1] != registration):
+            # The worker is gone, or its pid now belongs to another process
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        elif _is_registered_sibling(pid, registration):
+            siblings.append(pid)
+    return sorted(siblings)
+
+
+def install():
+    """Install the SIGPROF trigger and register this worker (main thread only)"""
+    global _registered_pid
+    if PROFILE_SIGNAL is None or _registered_pid == os.getpid():
+        return
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    signal.signal(PROFILE_SIGNAL, _handle_signal)
+    try:
+        os.makedirs(_workers_dir(), exist_ok=True)
+        identity = _proc_identity(os.getpid())
+        with open(os.path.join(_workers_dir(), str(os.getpid())), 'w') as f:
+            f.write(str(identity[1]) if identity else '')
+        _registered_pid = os.getpid()
+    except OSError as e:
+        logger.warning(f"Profiler registration failed: {str(e)}")
+
+
+def _unregister():
+    if _registered_pid == os.getpid():
+        try:
+            os.remove(os.path.join(_workers_dir(), str(_registered_pid)))
+        except OSError:
+            pass
+
+
+def _prune_sessions(keep):
+    """Remove all but the newest `keep` session directories"""
+    try:
+        entries = os.listdir(Config.PROFILE_DIR)
+    except OSError:
+        return
+    sessions = []
+    for entry in entries:
+        try:
+            sessions.append((os.path.getmtime(os.path.join(_session_dir(entry), 'session.json')), entry))
+        except OSError:
+            continue
+    for _, entry in sorted(sessions, reverse=True)[max(keep, 0):]:
+        shutil.rmtree(_session_dir(entry), ignore_errors=True)
+
+
+def start_session(seconds, interval, all_workers=True):
+    """Start a profile here and, if requested, in every sibling worker
+
+    Returns the session description including the workers asked to take part.
+    """
+    profile_id = uuid.uuid4().hex[:12]
+    workers = [os.getpid()]
+    session = {
+        "profile_id": profile_id,
+        "seconds": seconds,
+        "interval": interval,
+        "started_at": time.time(),
+        "expires_at": time.time() + 2,
+        "workers": workers
+    }
+
+    if not start_local(profile_id, seconds, interval):
+        return None
+
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    _prune_sessions(Config.PROFILE_KEEP_SESSIONS - 1)
+    if all_workers and PROFILE_SIGNAL is not None:
+        write_json(os.path.join(Config.PROFILE_DIR, 'current.json'), session)
+        for pid in sibling_workers():
+            try:
+                os.kill(pid, PROFILE_SIGNAL)
+                workers.append(pid)
+            except OSError:
+                pass
+
+    os.makedirs(_session_dir(profile_id), exist_ok=True)
+    write_json(os.path.join(_session_dir(profile_id), 'session.json'), session)
+    return session
+
+
+def load_session(profile_id):
+    """Merge per-worker results for a session; returns None for unknown ids"""
+    if not profile_id.isalnum():
+        return None
+    session_dir = _session_dir(profile_id)
+    try:
+        session = _read_json(os.path.join(session_dir, 'session.json'))
+    except (OSError, ValueError):
+        return None
+
+    results = []
+    for name in os.listdir(session_dir):
+        if name.endswith('.json') and name[:-5].isdigit():
+            try:
+                results.append(_read_json(os.path.join(session_dir, name)))
+            except (OSError, ValueError):
+                continue
+
+    session["reported_workers"] = sorted(result["worker"] for result in results)
+    session["complete"] = set(session["workers"]) <= set(session["reported_workers"])
+    session["results"] = results
+    return session
+
+
+def collapsed(results, split_workers=False):
+    """Render merged results as collapsed stack lines"""
+    counts = Counter()
+    for result in results:
+        prefix = f"worker:{result['worker']};" if split_workers else ''
+        for stack, count in result["stacks"].items():
+            counts[prefix + stack] += count
+    return '\n'.join(f"{stack} {count}" for stack, count in counts.most_common()) + '\n'
+
+
+atexit.register(_unregister)
@@ -0,0 +1,275 @@
+import json
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+
+class SharedLogBuffer:
+    """Fixed-size ring of log entries in a memory-mapped file shared by all workers on a host.
+
+    Every entry gets a monotonically increasing sequence id, so readers can ask
+    for everything after a cursor. Writers serialise on an flock held on the
+    backing file; readers validate each slot's sequence id so entries that were
+    overwritten while being read are skipped instead of returned torn.
+    """
+
+    MAGIC = b'OBLOGBF1'
+    HEADER = struct.Struct('<8sQII')   # magic, next_seq, slot_count, slot_size
+    SLOT_HEADER = struct.Struct('<QI')  # seq, payload length
+
+    def __init__(self, path, slot_count=4096, slot_size=1024):
+        if fcntl is None:
+            raise OSError("SharedLogBuffer requires fcntl (POSIX)")
+        if slot_size <= self.SLOT_HEADER.size + 64:
+            raise ValueError("slot_size is too small")
+
+        self.path = path
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.size = self.HEADER.size + slot_count * slot_size
+
+        self._fd = self._open_locked()
+        try:
+            self._initialise()
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _open_locked(self):
+        """Open the file at self.path and lock it, retrying if it was replaced while we waited
+
+        Another process may swap in a new file (see _initialise) while we are
+        blocked on the lock of the old one. Initialising the old inode would
+        replace the new file again and leave that process writing to an
+        orphan, so we only proceed once the locked inode is the one at path.
+        """
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _initialise(self):
+        """Create or reuse the backing file; replace it if its layout does not match
+
+        Other processes may have the existing file mapped, so it is never
+        truncated: shrinking a mapped file makes their next access fault
+        (SIGBUS). A mismatched file is swapped for a fresh one with
+        os.replace; existing mappings keep the old inode until they close.
+        """
+        size = os.fstat(self._fd).st_size
+        if size == self.size:
+            self._map = mmap.mmap(self._fd, self.size)
+            magic, _, slot_count, slot_size = self.HEADER.unpack_from(self._map, 0)
+            if (magic, slot_count, slot_size) == (self.MAGIC, self.slot_count, self.slot_size):
+                return
+            self._map.close()
+        elif size == 0:
+            # Newly created; nobody maps the file before it is initialised under the lock
+            os.ftruncate(self._fd, self.size)
+            self._map = mmap.mmap(self._fd, self.size)
+            self.HEADER.pack_into(self._map, 0, self.MAGIC, 1, self.slot_count, self.slot_size)
+            return
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, self.size)
+            self._map = mmap.mmap(fd, self.size)
+            self.HEADER.pack_into(self._map, 0, self.MAGIC, 1, self.slot_count, self.slot_size)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.close(fd)
+            raise
+        # Hand over to the new file; the caller releases the lock on self._fd
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = fd
+
+    def _slot_offset(self, seq):
+        return self.HEADER.size + (seq % self.slot_count) * self.slot_size
+
+    def _encode(self, entry):
+        """Serialise an entry, shortening its message until it fits in one slot"""
+        limit = self.slot_size - self.SLOT_HEADER.size
+        payload = json.dumps(entry, separators=(',', ':')).encode('utf-8')
+        if len(payload) <= limit:
+            return payload
+
+        entry = dict(entry)
+        message = str(entry.get('message', ''))
+        overflow = len(payload) - limit
+        while overflow > 0 and message:
+            message = message[:max(0, len(message) - overflow - 16)]
+            entry['message'] = message + '...[truncated]'
+            payload = json.dumps(entry, separators=(',', ':')).encode('utf-8')
+            overflow = len(payload) - limit
+        if overflow <= 0:
+            return payload
+
+        # Other fields alone overflow the slot: keep a valid placeholder so
+        # readers see that an entry existed instead of skipping a torn one
+        placeholder = {key: entry[key] for key in ('seq', 'timestamp', 'level', 'worker') if key in entry}
+        placeholder['message'] = f"[entry of {overflow + limit} bytes does not fit a {self.slot_size} byte slot]"
+        placeholder['truncated'] = True
+        payload = json.dumps(placeholder, separators=(',', ':')).encode('utf-8')
+        if len(payload) > limit:
+            payload = json.dumps({'seq': entry['seq'], 'truncated': True}, separators=(',', ':')).encode('utf-8')
+        return payload
+
+    def append(self, entry):
+        """Append an entry and return its sequence id"""
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            seq = self.HEADER.unpack_from(self._map, 0)[1]
+            entry = dict(entry, seq=seq)
+            payload = self._encode(entry)
+            offset = self._slot_offset(seq)
+            self.SLOT_HEADER.pack_into(self._map, offset, seq, len(payload))
+            self._map[offset + self.SLOT_HEADER.size:offset + self.SLOT_HEADER.size + len(payload)] = payload
+            struct.pack_into('<Q', self._map, 8, seq + 1)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return seq
+
+    def last_seq(self):
+        """Sequence id of the newest entry (0 when empty)"""
+        return self.HEADER.unpack_from(self._map, 0)[1] - 1
+
+    def first_seq(self):
+        """Sequence id of the oldest entry still held in the ring"""
+        return max(1, self.HEADER.unpack_from(self._map, 0)[1] - self.slot_count)
+
+    def read(self, since=0, limit=100, level=None):
+        """Return entries with seq > since, oldest first, plus the cursor to resume from
+
+        With since=0 only the newest `limit` matching entries are returned, like
+        the in-memory buffer always did; with a cursor, entries are returned
+        from the cursor forwards so a poller never misses any.
+        """
+        next_seq = self.HEADER.unpack_from(self._map, 0)[1]
+        first = max(since + 1, next_seq - self.slot_count, 1)
+        level = level.upper() if level else None
+
+        # Decode only as many slots as needed: newest-first for a tail, oldest-first from a cursor
+        seqs = range(first, next_seq) if since else range(next_seq - 1, first - 1, -1)
+        entries = []
+        for seq in seqs:
+            entry = self._read_slot(seq)
+            if entry is None:
+                continue
+            if level and entry.get('level') != level:
+                continue
+            entries.append(entry)
+            if len(entries) == limit:
+                break
+
+        if since:
+            cursor = entries[-1]['seq'] if len(entries) == limit else next_seq - 1
+        else:
+            entries.reverse()
+            cursor = next_seq - 1
+
+        return entries, max(cursor, since)
+
+    def _read_slot(self, seq):
+        offset = self._slot_offset(seq)
+        slot_seq, length = self.SLOT_HEADER.unpack_from(self._map, offset)
+        if slot_seq != seq or length > self.slot_size - self.SLOT_HEADER.size:
+            return None
+        start = offset + self.SLOT_HEADER.size
+        payload = self._map[start:start + length]
+        # The slot may have been recycled by a writer while we copied it
+        if self.SLOT_HEADER.unpack_from(self._map, offset)[0] != seq:
+            return None
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    def stats(self):
+        return {"kind": "shared", "mapped_bytes": self.size, "slots": self.slot_count}
+
+    def close(self):
+        try:
+            self._map.close()
+        finally:
+            os.close(self._fd)
+
+
+class LocalLogBuffer:
+    """In-process buffer with the same interface, used when shared memory is unavailable"""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._entries = []
+        self._next_seq = 1
+        self._lock = threading.Lock()
+
+    def append(self, entry):
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._entries.append(dict(entry, seq=seq))
+            # Keep only the last 'capacity' logs in memory
+            if len(self._entries) > self.capacity:
+                self._entries = self._entries[-self.capacity:]
+        return seq
+
+    def last_seq(self):
+        return self._next_seq - 1
+
+    def first_seq(self):
+        return self._entries[0]['seq'] if self._entries else self._next_seq
+
+    def read(self, since=0, limit=100, level=None):
+        entries = [entry for entry in self._entries if entry['seq'] > since]
+        if level:
+            entries = [entry for entry in entries if entry['level'] == level.upper()]
+
+        if since:
+            entries = entries[:limit]
+            cursor = entries[-1]['seq'] if len(entries) == limit else self.last_seq()
+        else:
+            entries = entries[-limit:]
+            cursor = self.last_seq()
+
+        return entries, max(cursor, since)
+
+    def stats(self):
+        with self._lock:
+            return {"kind": "local", "entries": len(self._entries), "capacity": self.capacity}
+
+    def close(self):
+        pass
+
+
+def read_since(buffer, since=0, limit=100, level=None):
+    """Read entries after a sequence cursor
+
+    Returns (entries, cursor, info) where cursor is the seq to pass as `since`
+    on the next call. info reports entries lost to ring wrap-around or a
+    buffer reset so pollers know their view is incomplete.
+    """
+    info = {'reset': False, 'missed': 0}
+
+    if since and since > buffer.last_seq():
+        # Buffer was recreated (e.g. host reboot); restart from the oldest entry
+        info['reset'] = True
+        since = buffer.first_seq() - 1
+    elif since and since + 1 < buffer.first_seq():
+        info['missed'] = buffer.first_seq() - since - 1
+
+    entries, cursor = buffer.read(since=since, limit=limit, level=level)
+    return entries, cursor, info
@@ -0,0 +1,89 @@
+"""Slow-request exemplars.
+
+A request whose latency reaches SLOW_REQUEST_MS is recorded as a structured
+exemplar built from its request trace (see utils/request_trace.py):
+payload size, item and candidate counts, the stage that short-circuited,
+per-stage timings, encoder batch size and worker id. Exemplars go to a
+second host-wide ring buffer with larger slots than the log buffer, so they
+are bounded, shared by all workers and readable with the same cursor
+semantics as /logs.
+"""
+import os
+import threading
+from datetime import datetime
+from config import Config
+from logger_config import Logger
+from utils.shared_log_buffer import SharedLogBuffer, LocalLogBuffer, read_since
+
+logger = Logger.get_logger()
+
+_buffer = None
+_buffer_pid = None
+_buffer_lock = threading.Lock()
+
+
+def _get_buffer():
+    """Open the exemplar buffer on first use in this process"""
+    global _buffer, _buffer_pid
+    with _buffer_lock:
+        if _buffer is None or _buffer_pid != os.getpid():
+            _buffer_pid = os.getpid()
+            _buffer = None
+            if Config.LOG_BUFFER_ENABLED:
+                try:
+                    _buffer = SharedLogBuffer(
+                        Config.SLOW_REQUEST_BUFFER_PATH,
+                        slot_count=Config.SLOW_REQUEST_SLOTS,
+                        slot_size=Config.SLOW_REQUEST_SLOT_SIZE
+                    )
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Shared slow-request buffer unavailable, using per-worker buffer: {str(e)}")
+            if _buffer is None:
+                _buffer = LocalLogBuffer(capacity=Config.SLOW_REQUEST_SLOTS)
+        return _buffer
+
+
+def exemplar(trace, total_ms):
+    """Structured exemplar for a finished request trace"""
+    stages = [
+        {key: value for key, value in record.items() if key != "retained_bytes"}
+        for record in trace.stages
+    ]
+    attributed = sum(record["duration_ms"] for record in stages)
+    attributes = dict(trace.attributes)
+    message = (
+        f"{trace.name} took {total_ms:.1f}ms: {attributes.get('items')} items, "
+        f"{attributes.get('candidates')} candidates, short_circuit={attributes.get('short_circuit')}"
+    )
+    return dict(
+        attributes,
+        timestamp=datetime.now().isoformat(),
+        message=message,
+        request=trace.name,
+        worker=os.getpid(),
+        total_ms=round(total_ms, 3),
+        unattributed_ms=round(max(0.0, total_ms - attributed), 3),
+        stages=stages
+    )
+
+
+def capture(trace):
+    """Record the trace as an exemplar if the request was slow; returns its seq or None"""
+    if trace is None or Config.SLOW_REQUEST_MS <= 0:
+        return None
+    total_ms = trace.elapsed_ms()
+    if total_ms < Config.SLOW_REQUEST_MS:
+        return None
+    try:
+        entry = exemplar(trace, total_ms)
+        seq = _get_buffer().append(entry)
+    except Exception as e:
+        logger.error(f"Failed to record slow-request exemplar: {str(e)}")
+        return None
+    logger.warning(f"Slow request #{seq}: {entry['message']}")
+    return seq
+
+
+def read(since=0, limit=100):
+    """Read exemplars after a cursor; returns (exemplars, cursor, info) like Logger.read_logs"""
+    return read_since(_get_buffer(), since=since, limit=limit)
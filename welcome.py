@@ -232,6 +232,11 @@ WELCOME_HTML = '''
                     <span class="endpoint-path">/api/health</span>
                     <span class="endpoint-desc">Health check endpoint</span>
                 </div>
+                <div class="endpoint-card">
+                    <span class="endpoint-method get">GET</span>
+                    <span class="endpoint-path">/api/ready</span>
+                    <span class="endpoint-desc">Readiness probe (model loaded and warm)</span>
+                </div>
                 <div class="endpoint-card">
                     <span class="endpoint-method get">GET</span>
                     <span class="endpoint-path">/api/status</span>
@@ -242,6 +247,16 @@ WELCOME_HTML = '''
                     <span class="endpoint-path">/api/logs</span>
                     <span class="endpoint-desc">View application logs</span>
                 </div>
+                <div class="endpoint-card">
+                    <span class="endpoint-method get">GET</span>
+                    <span class="endpoint-path">/api/logs/stream</span>
+                    <span class="endpoint-desc">Tail logs from all workers (admin)</span>
+                </div>
+                <div class="endpoint-card">
+                    <span class="endpoint-method get">GET</span>
+                    <span class="endpoint-path">/api/logs/slow</span>
+                    <span class="endpoint-desc">Slow-request exemplars with stage timings</span>
+                </div>
                 <div class="endpoint-card">
                     <span class="endpoint-method get">GET</span>
                     <span class="endpoint-path">/api/logs/levels</span>